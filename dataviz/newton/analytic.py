@@ -0,0 +1,310 @@
+import numpy as np
+
+from .newton import *
+from .render import get_grid_axes
+
+#######
+#
+#    DUAL NUMBERS
+#
+##########################################################################
+
+class Dual():
+    """
+    Array of dual numbers `a + b*eps` with `eps**2 = 0`. Evaluating a
+    function on `Dual(x, 1)` gives `f(x) + f'(x)*eps`, so the derivative
+    is obtained in the same vectorized pass as the function itself.
+
+    NumPy ufuncs (eg. `np.sin`, `np.exp`) are dispatched through
+    `__array_ufunc__` to the rules in `DUAL_RULES`.
+    """
+
+    def __init__(self, a, b=0):
+        self.a = a
+        self.b = b
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs or ufunc not in DUAL_RULES:
+            return NotImplemented
+        return DUAL_RULES[ufunc](*(_dual(x) for x in inputs))
+
+    def __add__(self, other): return np.add(self, other)
+    def __radd__(self, other): return np.add(other, self)
+    def __sub__(self, other): return np.subtract(self, other)
+    def __rsub__(self, other): return np.subtract(other, self)
+    def __mul__(self, other): return np.multiply(self, other)
+    def __rmul__(self, other): return np.multiply(other, self)
+    def __truediv__(self, other): return np.true_divide(self, other)
+    def __rtruediv__(self, other): return np.true_divide(other, self)
+    def __pow__(self, other): return np.power(self, other)
+    def __rpow__(self, other): return np.power(other, self)
+    def __neg__(self): return np.negative(self)
+    def __pos__(self): return self
+
+def _dual(x):
+    return x if isinstance(x, Dual) else Dual(x)
+
+def _lift(x, n):
+    """
+    Seed `x` as the variable of `n` nested levels of dual numbers, so
+    that evaluating a function on it gives its first `n` derivatives.
+    """
+    return x if n == 0 else Dual(_lift(x, n-1), 1)
+
+def _part(d, k, n):
+    """
+    The `k`-th derivative from the result `d` of a function evaluated
+    on `_lift(x, n)`.
+    """
+    for i in range(n):
+        if not isinstance(d, Dual):
+            # Constant part of the result
+            return d if i >= k else 0
+        d = d.b if i < k else d.a
+    return d
+
+def _is_const(u):
+    # Constants are wrapped with an exact scalar zero derivative
+    return np.isscalar(u.b) and u.b == 0
+
+def _chain(f, df):
+    """
+    Rule of a single-argument function from its value and derivative.
+    """
+    return lambda u : Dual(f(u.a), df(u.a) * u.b)
+
+def _divide(u, v):
+    q = u.a / v.a
+    return Dual(q, (u.b - q*v.b) / v.a)
+
+def _power(u, v):
+    if _is_const(v):
+        n = v.a
+        return Dual(u.a**n, n * u.a**(n-1) * u.b)
+    w = u.a**v.a
+    return Dual(w, w * (v.b*np.log(u.a) + v.a*u.b/u.a))
+
+DUAL_RULES = {
+    np.add : lambda u, v : Dual(u.a + v.a, u.b + v.b),
+    np.subtract : lambda u, v : Dual(u.a - v.a, u.b - v.b),
+    np.multiply : lambda u, v : Dual(u.a * v.a, u.a*v.b + u.b*v.a),
+    np.true_divide : _divide,
+    np.power : _power,
+    np.negative : lambda u : Dual(-u.a, -u.b),
+    np.positive : lambda u : u,
+    np.square : lambda u : Dual(u.a**2, 2*u.a*u.b),
+    np.reciprocal : lambda u : _divide(Dual(1), u),
+    np.sqrt : lambda u : (lambda s : Dual(s, u.b / (2*s)))(np.sqrt(u.a)),
+    np.exp : lambda u : (lambda e : Dual(e, e * u.b))(np.exp(u.a)),
+    np.expm1 : _chain(np.expm1, np.exp),
+    np.log : lambda u : Dual(np.log(u.a), u.b / u.a),
+    np.log1p : lambda u : Dual(np.log1p(u.a), u.b / (1 + u.a)),
+    np.sin : _chain(np.sin, np.cos),
+    np.cos : _chain(np.cos, lambda a : -np.sin(a)),
+    np.tan : _chain(np.tan, lambda a : 1 / np.cos(a)**2),
+    np.sinh : _chain(np.sinh, np.cosh),
+    np.cosh : _chain(np.cosh, np.sinh),
+    np.tanh : _chain(np.tanh, lambda a : 1 / np.cosh(a)**2),
+}
+
+
+
+#######
+#
+#    ANALYTIC FUNCTIONS
+#
+##########################################################################
+
+class AnalyticFunction():
+    """
+    An arbitrary analytic function that can be iterated in place of a
+    `Polynomial`. The derivative is computed with forward-mode automatic
+    differentiation on dual numbers, and the roots are discovered from
+    the converged points of a Newton-Raphson run.
+
+    Functions are only supported by the `numpy` backend, and have to be
+    picklable (eg. defined at module level) for parallel rendering.
+    """
+
+    def __init__(self, func, name=None,
+                 grid_lim_x=(-2, 2), grid_lim_y=(-2, 2)):
+        """
+        Parameters:
+        -----------
+        func : callable
+          Vectorized complex function built from arithmetic operators
+          and the NumPy ufuncs in `DUAL_RULES`.
+        name : str, optional
+          Name of the function used in figure titles.
+        grid_lim_x, grid_lim_y : tuple of float
+          Window searched by `roots()`. Transcendental functions can
+          have infinitely many roots, so they are only looked for here.
+        """
+        self.func = func
+        self.name = getattr(func, '__name__', 'f') if name is None else name
+        self.grid_lim_x = grid_lim_x
+        self.grid_lim_y = grid_lim_y
+        self._roots = None
+
+    def f(self, x):
+        return self.func(x)
+
+    def fprime(self, x):
+        return self.f_and_fprime(x)[1]
+
+    def f_and_fprime(self, x, out=None):
+        """
+        Evaluate the function and its derivative in a single pass.
+        See `f_derivs`.
+        """
+        return self.f_derivs(x, n=1, out=out)
+
+    def f_derivs(self, x, n=2, out=None):
+        """
+        Evaluate the function and its first `n` derivatives in a single
+        pass over nested dual numbers. The cost grows as `2**n`, so it is
+        meant for the few derivatives used by the iteration schemes.
+
+        Parameters:
+        -----------
+        x : array-like
+          Points to evaluate the function at.
+        n : int
+          Number of derivatives to compute.
+        out : tuple of numpy.ndarray, optional
+          Arrays to store `f(x)`, `f'(x)`, ... into.
+
+        Returns:
+        --------
+        p, dp, ... : numpy.ndarray
+          Values of `f(x)` and its first `n` derivatives.
+        """
+        d = self.func(_lift(x, n))
+        if out is None:
+            dtype = np.result_type(x, np.complex64)
+            out = tuple(np.empty(np.shape(x), dtype=dtype)
+                        for _ in range(n + 1))
+        # Constant parts of `func` leave scalars in the result
+        for k in range(n + 1):
+            np.copyto(out[k], _part(d, k, n), casting='same_kind')
+        return out[:n+1]
+
+    def f_str(self):
+        return self.name
+
+    def roots(self, N=128, n_steps=100, tol=1e-10):
+        """
+        Roots of the function inside the search window, found by
+        iterating an `N x N` grid of starting points and clustering the
+        converged end points.
+        """
+        if self._roots is None:
+            Z = get_starting_grid(N, self.grid_lim_x, self.grid_lim_y)
+            Y, n_iter = NR_iter_active(self, Z, n_steps, tol=tol)
+            roots = find_roots(self, Y[n_iter <= n_steps])
+            inside = ((roots.real >= min(self.grid_lim_x)) &
+                      (roots.real <= max(self.grid_lim_x)) &
+                      (roots.imag >= min(self.grid_lim_y)) &
+                      (roots.imag <= max(self.grid_lim_y)))
+            self._roots = roots[inside]
+            self._roots.setflags(write=False)
+        return self._roots
+
+    def bbox(self):
+        r = self.roots()
+        return ((r.real.min(), r.real.max()),
+                (r.imag.min(), r.imag.max()))
+
+def find_roots(F, Y, rtol=1e-6, ftol=1e-6):
+    """
+    Cluster converged Newton-Raphson end points into distinct roots.
+
+    The points are binned on a grid with `rtol` spacing, and the bins
+    closer than `2*rtol` to an already accepted root are merged into it.
+    Points where `|f|` is not below `ftol` are dropped, since the method
+    can stall without reaching a root.
+
+    Parameters:
+    -----------
+    F : AnalyticFunction or Polynomial
+      The function that was iterated.
+    Y : array-like
+      End points of the converged starting points.
+
+    Returns:
+    --------
+    roots : numpy.ndarray
+      The distinct roots, sorted by their real then imaginary parts.
+    """
+    Y = np.asarray(Y, dtype=np.complex128).reshape(-1)
+    Y = Y[np.isfinite(Y)]
+    if Y.size == 0:
+        return np.empty(0, dtype=np.complex128)
+
+    # Bin the points and average the members of every bin
+    keys = np.stack((np.round(Y.real / rtol), np.round(Y.imag / rtol)))
+    _, inv, counts = np.unique(keys, axis=1,
+                               return_inverse=True, return_counts=True)
+    inv = inv.reshape(-1)
+    cand = (np.bincount(inv, weights=Y.real) +
+            np.bincount(inv, weights=Y.imag)*1j) / counts
+    cand = cand[np.argsort(-counts, kind='stable')]
+    with np.errstate(all='ignore'):
+        cand = cand[np.abs(F.f(cand)) < ftol]
+
+    roots = []
+    for c in cand:
+        if not roots or np.min(np.abs(np.array(roots) - c)) > 2*rtol:
+            roots.append(c)
+    roots = np.array(roots, dtype=np.complex128)
+    return roots[np.lexsort((roots.imag, roots.real))]
+
+
+
+#######
+#
+#    RENDERING
+#
+##########################################################################
+
+def NR_render_analytic(F, N, n_steps=50,
+                       grid_lim_x=None, grid_lim_y=None,
+                       tol=1e-8, dtype=np.complex128):
+    """
+    Render the basins of an analytic function, discovering its roots
+    from the converged points of the render itself.
+
+    Parameters:
+    -----------
+    F : AnalyticFunction
+      The function to find the roots of.
+    N : int or tuple of 2 int
+      Resolution of the image, `N` or `(ny, nx)`.
+    n_steps : int
+      Maximum number of steps per point.
+    grid_lim_x, grid_lim_y : tuple of float, optional
+      Limits of the window. Default to the search window of `F`.
+    tol : float
+      Step-length threshold for convergence.
+
+    Returns:
+    --------
+    basin : numpy.ndarray
+      Index of the closest root in `roots` for every pixel.
+    n_iter : numpy.ndarray
+      Number of steps taken by every pixel.
+    roots : numpy.ndarray
+      Roots reached from the window.
+    """
+    if grid_lim_x is None: grid_lim_x = F.grid_lim_x
+    if grid_lim_y is None: grid_lim_y = F.grid_lim_y
+
+    x, y = get_grid_axes(N, grid_lim_x, grid_lim_y, dtype=dtype)
+    Y, n_iter = NR_iter_active(F, x + y[:,None]*1j, n_steps, tol=tol)
+
+    roots = find_roots(F, Y[n_iter <= n_steps],
+                       rtol=max(np.sqrt(tol), 1e-6),
+                       ftol=max(np.sqrt(tol), 1e-6))
+    if roots.size == 0:
+        return np.zeros(Y.shape, dtype=np.uint8), n_iter, roots
+    return closest_roots(Y, roots), n_iter, roots
@@ -0,0 +1,146 @@
+import os
+import subprocess
+import numpy as np
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+
+from .newton import *
+from .render import NR_render_tiled, get_shape
+from .backends import check_backend
+from .image import get_lut, NR_rgba
+from .cache import cache_key
+
+
+def NR_frame_rgb(P, N, n_steps=30,
+                 grid_lim_x=None, grid_lim_y=None,
+                 tol=1e-8, backend=None, dtype=np.complex128):
+    """
+    Render a single frame directly into an `(rows, cols, 3)` uint8 RGB
+    array, without setting up a matplotlib figure.
+    """
+    basin, _ = NR_render_tiled(P, N, n_steps,
+                               grid_lim_x=grid_lim_x, grid_lim_y=grid_lim_y,
+                               tol=tol, out_iter=False, backend=backend,
+                               dtype=dtype)
+    rgba = NR_rgba(basin, get_lut(len(P.roots())))
+    return np.ascontiguousarray(rgba[..., :3])
+
+def get_frame_path(outdir, i):
+    return os.path.join(outdir, f'frame_{i:05d}.png')
+
+def _save_frame(path, rgb):
+    # Write to a temporary file first, so that an interrupted render
+    # never leaves a truncated frame behind that would be reused
+    tmp = path + '.tmp'
+    plt.imsave(tmp, rgb, format='png')
+    os.replace(tmp, path)
+
+def _load_frame(path):
+    rgb = plt.imread(path)
+    if rgb.dtype != np.uint8:
+        rgb = (rgb * 255 + 0.5).astype(np.uint8)
+    return rgb[..., :3]
+
+def _render_frame(task):
+    P, N, n_steps, tol, backend, dtype, grid_lim, path, return_rgb = task
+
+    if (path is not None) and os.path.exists(path):
+        return _load_frame(path) if return_rgb else None
+
+    rgb = NR_frame_rgb(P, N, n_steps, *grid_lim, tol=tol,
+                       backend=backend, dtype=dtype)
+    if path is not None:
+        _save_frame(path, rgb)
+    return rgb if return_rgb else None
+
+def _open_ffmpeg(fname, shape, fps):
+    ny, nx = shape
+    cmd = ['ffmpeg', '-y', '-loglevel', 'error',
+           '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+           '-s', f'{nx}x{ny}', '-r', str(fps), '-i', '-',
+           '-pix_fmt', 'yuv420p', fname]
+    return subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+def NR_zoom_animation(P, gl_s, gl_e, n_frames=50,
+                      N=512, n_steps=30, tol=1e-8,
+                      outdir='./out/frames/',
+                      n_workers=None, ffmpeg=None, fps=30,
+                      backend=None, dtype=np.complex128):
+    """
+    Render the frames of a zoom between two windows in parallel.
+
+    Frames already found in `outdir` are not rendered again, so an
+    interrupted animation can be continued by calling the function
+    again with the same arguments. The frames are stored in a
+    subdirectory named after a hash of the render parameters, so
+    animations with different parameters never share frames.
+
+    Parameters:
+    -----------
+    P : Polynomial
+      The polynomial to find the roots of.
+    gl_s, gl_e : tuple
+      The `((xmin, xmax), (ymin, ymax))` windows of the first and
+      last frames (see `NR_fractal_get_frames`).
+    n_frames : int
+      Number of frames.
+    N : int or tuple
+      Side length or `(rows, cols)` shape of the frames.
+    outdir : str or None
+      Directory of the PNG frame caches. If `None`, frames are not saved.
+    n_workers : int or None
+      Number of worker processes. Defaults to the number of CPUs.
+    ffmpeg : str or None
+      If given, the raw RGB frames are also piped to a local `ffmpeg`
+      process in order, which encodes them into this video file. The
+      frame dimensions have to be even for the default pixel format.
+    fps : int
+      Frame rate of the video.
+    dtype : numpy.dtype
+      Precision of the iteration (see `NR_render_tiled`).
+    """
+    if n_workers is None: n_workers = os.cpu_count()
+    backend = check_backend(backend)
+    if outdir is not None:
+        key = cache_key('frames', P, {
+            'gl_s' : np.asarray(gl_s, dtype=float).tolist(),
+            'gl_e' : np.asarray(gl_e, dtype=float).tolist(),
+            'n_frames' : n_frames, 'N' : get_shape(N),
+            'n_steps' : n_steps, 'tol' : tol, 'backend' : backend,
+            'dtype' : np.dtype(dtype).str,
+        })
+        outdir = os.path.join(outdir, key[:16])
+        os.makedirs(outdir, exist_ok=True)
+
+    grid_lims = NR_fractal_get_grid_lims(
+                    NR_fractal_get_frames(gl_s, gl_e, n=n_frames)
+                )
+    return_rgb = ffmpeg is not None
+    tasks = [(P, N, n_steps, tol, backend, dtype, grid_lim,
+              None if outdir is None else get_frame_path(outdir, i),
+              return_rgb)
+             for i, grid_lim in enumerate(grid_lims)]
+    if not return_rgb:
+        # Without a video, there is nothing to do for cached frames
+        tasks = [t for t in tasks
+                 if (t[7] is None) or not os.path.exists(t[7])]
+
+    proc = _open_ffmpeg(ffmpeg, get_shape(N), fps) if return_rgb else None
+    try:
+        if n_workers == 1:
+            frames = map(_render_frame, tasks)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=n_workers)
+            frames = pool.map(_render_frame, tasks)
+
+        # Frames are returned in order, so they can be streamed as is
+        for rgb in frames:
+            if proc is not None:
+                proc.stdin.write(np.ascontiguousarray(rgb).tobytes())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if proc is not None:
+            proc.stdin.close()
+            proc.wait()
@@ -0,0 +1,249 @@
+import numpy as np
+
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+from .newton import *
+
+#######
+#
+#    BACKEND SELECTION
+#
+##########################################################################
+
+BACKENDS = ('numpy', 'numexpr', 'numba')
+
+_backend = {'name' : 'numpy'}
+
+def available_backends():
+    avail = {'numpy' : True, 'numexpr' : ne is not None,
+             'numba' : numba is not None}
+    return tuple(b for b in BACKENDS if avail[b])
+
+def check_backend(name):
+    """
+    Resolve a backend name (`None` means the global default) and check
+    whether the backend can be used.
+    """
+    if name is None:
+        name = _backend['name']
+    assert name in BACKENDS, \
+           f"Unknown backend '{name}', choose from {BACKENDS}!"
+    if name not in available_backends():
+        raise ImportError(f"The '{name}' backend needs the `{name}` "
+                          "package to be installed!")
+    return name
+
+def set_backend(name):
+    """
+    Set the default backend of the iterate-and-classify kernel.
+    """
+    _backend['name'] = check_backend(name)
+
+def get_backend():
+    return _backend['name']
+
+
+
+#######
+#
+#    NUMPY BACKEND
+#
+##########################################################################
+
+def _kernel_numpy(P, Z, n_steps, tol=None, delta=None):
+    if tol is None:
+        Y = NR_iter(P, Z, n_steps, delta=delta)
+        n_iter = np.full(Z.shape, n_steps, dtype=iter_dtype(n_steps))
+    else:
+        Y, n_iter = NR_iter_active(P, Z, n_steps, tol=tol, delta=delta)
+    basin = closest_roots(Y, P.roots())
+    return basin, n_iter
+
+
+
+#######
+#
+#    NUMEXPR BACKEND
+#
+##########################################################################
+
+# Number of arrays that `numexpr` takes besides the output (the operand
+# limit of `numpy.nditer` is 64)
+NE_MAX_INPUTS = 62
+
+def _horner_expr(c, prefix=None):
+    """
+    Build a Horner-scheme `numexpr` expression of a polynomial. The
+    coefficients are referenced as the variables `{prefix}0`, ... or,
+    without a prefix, written into the expression as literals.
+    """
+    if prefix is None:
+        terms = [repr(complex(c_)) for c_ in c]
+    else:
+        terms = [f'{prefix}{i}' for i in range(len(c))]
+    expr = terms[0]
+    for term in terms[1:]:
+        expr = f'({expr})*z + {term}'
+    return expr
+
+def _delta_numexpr(P, x, buf=None):
+    c = P.coeff_like(x)
+    cprime = P.pcoeff_().astype(c.dtype)
+    if cprime.size == 0:
+        cprime = np.zeros(1, dtype=c.dtype)
+
+    local_dict = {'z' : x}
+    if 1 + c.size + cprime.size <= NE_MAX_INPUTS:
+        expr = f'({_horner_expr(c, "c")}) / ({_horner_expr(cprime, "d")})'
+        local_dict.update({f'c{i}' : c_ for i, c_ in enumerate(c)})
+        local_dict.update({f'd{i}' : c_ for i, c_ in enumerate(cprime)})
+    else:
+        # Literal coefficients are slower, but are not limited in number
+        expr = f'({_horner_expr(c)}) / ({_horner_expr(cprime)})'
+    out = None if buf is None else buf[0]
+    dx = ne.evaluate(expr, local_dict=local_dict, out=out,
+                     casting='same_kind')
+    return NR_guard_delta(P, x, dx)
+
+def _kernel_numexpr(P, Z, n_steps, tol=None):
+    return _kernel_numpy(P, Z, n_steps, tol=tol, delta=_delta_numexpr)
+
+
+
+#######
+#
+#    NUMBA BACKEND
+#
+##########################################################################
+
+def _NR_pixels(Z, c, c64, roots, n_steps, tol, basin, n_iter):
+    """
+    Iterate and classify every point separately, stopping as soon as
+    the point converged. Mirrors `NR_iter_active` + `closest_roots`.
+
+    Non-finite steps are recomputed with the double precision
+    coefficients `c64`, like in `NR_guard_delta`. `Z` is used as work
+    array, so that these steps are cast back to the precision of `Z`.
+    """
+    for k in numba.prange(Z.size):
+        z = Z[k]
+        n = n_steps + 1 if tol >= 0 else n_steps
+        for i in range(n_steps):
+            p = c[0]
+            dp = c[0] * 0
+            for j in range(1, c.size):
+                dp = dp*z + p
+                p = p*z + c[j]
+            dz = p / dp
+            if not (np.isfinite(dz.real) and np.isfinite(dz.imag)):
+                z64 = np.complex128(z)
+                p64 = c64[0]
+                dp64 = c64[0] * 0
+                for j in range(1, c64.size):
+                    dp64 = dp64*z64 + p64
+                    p64 = p64*z64 + c64[j]
+                dz64 = p64 / dp64
+                if not (np.isfinite(dz64.real) and np.isfinite(dz64.imag)):
+                    break
+                Z[k] = z64 - dz64
+                z = Z[k]
+                if abs(dz64) < tol:
+                    n = i + 1
+                    break
+                continue
+            z = z - dz
+            if abs(dz) < tol:
+                n = i + 1
+                break
+
+        best, d_best = 0, abs(z - roots[0])
+        for j in range(1, roots.size):
+            d = abs(z - roots[j])
+            if d < d_best:
+                best, d_best = j, d
+
+        basin[k] = best
+        n_iter[k] = n
+
+_jit = {}
+
+def _get_NR_pixels():
+    if 'NR_pixels' not in _jit:
+        _jit['NR_pixels'] = numba.njit(parallel=True,
+                                       error_model='numpy')(_NR_pixels)
+    return _jit['NR_pixels']
+
+def _kernel_numba(P, Z, n_steps, tol=None):
+    Z = np.asarray(Z)
+    # Everything is computed in the precision of the starting points
+    dtype = np.result_type(Z.dtype, np.complex64)
+    roots = np.asarray(P.roots()).astype(dtype)
+
+    basin = np.empty(Z.shape, dtype=basin_dtype(roots.size))
+    n_iter = np.empty(Z.shape, dtype=iter_dtype(n_steps))
+    # Without a tolerance every point takes all `n_steps` steps
+    if tol is None:
+        tol = -1.0
+    else:
+        tol = max(float(tol), 100 * float(np.finfo(dtype).eps))
+
+    _get_NR_pixels()(np.array(Z, dtype=dtype).reshape(-1),
+                     P.coeff_().astype(dtype),
+                     P.coeff_().astype(np.complex128),
+                     roots, n_steps, tol,
+                     basin.reshape(-1), n_iter.reshape(-1))
+    return basin, n_iter
+
+
+
+#######
+#
+#    KERNEL
+#
+##########################################################################
+
+_kernels = {
+    'numpy'   : _kernel_numpy,
+    'numexpr' : _kernel_numexpr,
+    'numba'   : _kernel_numba,
+}
+
+def NR_kernel(P, Z, n_steps, tol=None, backend=None, scheme=None):
+    """
+    Iterate the points `Z` with the Newton-Raphson method and classify
+    them by their closest root, using the selected backend.
+
+    Parameters:
+    -----------
+    backend : str or None
+      One of `BACKENDS`. If `None`, the default set by `set_backend`
+      is used.
+    scheme : str or callable, optional
+      Iteration scheme (see `newton.get_scheme`). The compiled backends
+      only implement 'newton' with the plain Horner scheme, so other
+      schemes, high degree polynomials and functions without
+      coefficients (eg. `AnalyticFunction`) always run on `numpy` when
+      no backend is given explicitly.
+
+    Returns:
+    --------
+    basin, n_iter : numpy.ndarray
+      Basin indices and step counts of the points (shape of `Z`).
+    """
+    # High degree polynomials need the overflow-free steps of `NR_delta`
+    scaled = getattr(P, 'scaled', False)
+    horner = hasattr(P, 'coeff_') and not scaled
+    if scheme in (None, 'newton', NR_delta) and horner:
+        return _kernels[check_backend(backend)](P, Z, n_steps, tol=tol)
+    assert backend in (None, 'numpy'), \
+           f"The '{backend}' backend only supports the 'newton' scheme " \
+           "of polynomials below `HIGH_DEGREE`!"
+    return _kernel_numpy(P, Z, n_steps, tol=tol, delta=get_scheme(scheme))
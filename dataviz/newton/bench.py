@@ -0,0 +1,235 @@
+"""
+Benchmarks of the hot paths of the `newton` package.
+
+Run the suite and store the results of the current revision with
+
+    python -m newton.bench run [--quick] [--filter NAME] [--out DIR]
+
+and compare two stored runs with
+
+    python -m newton.bench compare OLD.json NEW.json
+"""
+import os
+import json
+import time
+import argparse
+import platform
+import itertools
+import subprocess
+import tracemalloc
+import numpy as np
+
+from .newton import *
+from .polynomial import Polynomial
+
+#######
+#
+#    BENCHMARK CASES
+#
+##########################################################################
+
+# Parameters swept by the suite: grid size, polynomial degree,
+# number of steps and precision
+SWEEP = {
+    'N'       : (256, 1024),
+    'degree'  : (5, 20),
+    'n_steps' : (10, 30),
+    'dtype'   : ('complex128', 'complex64'),
+}
+SWEEP_QUICK = {
+    'N'       : (256,),
+    'degree'  : (5,),
+    'n_steps' : (10,),
+    'dtype'   : ('complex128', 'complex64'),
+}
+
+def bench_polynomial(degree, seed=42):
+    c = np.random.default_rng(seed).normal(size=degree + 1)
+    c[0] = 1
+    return Polynomial(c)
+
+def _grid(N, dtype):
+    return get_starting_grid(N, (-1.5, 1.5), (-1.5, 1.5), dtype=dtype)
+
+def bench_starting_grid(N, degree, n_steps, dtype):
+    return lambda : get_starting_grid(N, (-1.5, 1.5), (-1.5, 1.5), dtype=dtype)
+
+def bench_f_fprime(N, degree, n_steps, dtype):
+    P, X = bench_polynomial(degree), _grid(N, dtype)
+    return lambda : (P.f(X), P.fprime(X))
+
+def bench_f_and_fprime(N, degree, n_steps, dtype):
+    P, X = bench_polynomial(degree), _grid(N, dtype)
+    return lambda : P.f_and_fprime(X)
+
+def bench_NR_iter(N, degree, n_steps, dtype):
+    P, X = bench_polynomial(degree), _grid(N, dtype)
+    return lambda : NR_iter(P, X, n_steps)
+
+def bench_NR_iter_active(N, degree, n_steps, dtype):
+    P, X = bench_polynomial(degree), _grid(N, dtype)
+    return lambda : NR_iter_active(P, X, n_steps, tol=1e-8)
+
+def bench_closest_roots(N, degree, n_steps, dtype):
+    P, X = bench_polynomial(degree), _grid(N, dtype)
+    roots = P.roots()
+    return lambda : closest_roots(X, roots)
+
+def bench_get_NR_colors(N, degree, n_steps, dtype):
+    P, X = bench_polynomial(degree), _grid(N, dtype)
+    return lambda : get_NR_colors(P, X)
+
+# Benchmarks and the parameters they depend on
+BENCHMARKS = {
+    'get_starting_grid' : (bench_starting_grid, ('N', 'dtype')),
+    'f_fprime'          : (bench_f_fprime, ('N', 'degree', 'dtype')),
+    'f_and_fprime'      : (bench_f_and_fprime, ('N', 'degree', 'dtype')),
+    'NR_iter'           : (bench_NR_iter, ('N', 'degree', 'n_steps', 'dtype')),
+    'NR_iter_active'    : (bench_NR_iter_active,
+                           ('N', 'degree', 'n_steps', 'dtype')),
+    'closest_roots'     : (bench_closest_roots, ('N', 'degree', 'dtype')),
+    'get_NR_colors'     : (bench_get_NR_colors, ('N', 'degree', 'dtype')),
+}
+
+
+
+#######
+#
+#    MEASUREMENT
+#
+##########################################################################
+
+def measure(func, repeat=3):
+    """
+    Best wall time of `repeat` runs and the peak memory allocated during
+    a separate traced run, in bytes.
+    """
+    times = []
+    for _ in range(repeat):
+        t_0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t_0)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak
+
+def run_suite(sweep=SWEEP, names=None, repeat=3, log=print):
+    results = []
+    for name, (setup, deps) in BENCHMARKS.items():
+        if (names is not None) and (name not in names):
+            continue
+        for values in itertools.product(*(sweep[d] for d in deps)):
+            params = dict(zip(deps, values))
+            args = {'N' : 0, 'degree' : 5, 'n_steps' : 10,
+                    'dtype' : 'complex128'}
+            args.update(params)
+            args['dtype'] = np.dtype(args['dtype'])
+
+            t, peak = measure(setup(**args), repeat=repeat)
+            res = {'name' : name, 'params' : params, 'time' : t,
+                   'pixels_per_s' : args['N']**2 / t, 'peak_mem' : peak}
+            results.append(res)
+            log(format_result(res))
+    return results
+
+def get_revision():
+    # Revision of the package, not of the working directory
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(__file__),
+                                       stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def get_metadata():
+    return {
+        'revision' : get_revision(),
+        'date'     : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python'   : platform.python_version(),
+        'numpy'    : np.__version__,
+        'machine'  : platform.machine(),
+        'cpus'     : os.cpu_count(),
+    }
+
+
+
+#######
+#
+#    REPORTING
+#
+##########################################################################
+
+def result_key(res):
+    params = ','.join(f'{k}={v}' for k, v in sorted(res['params'].items()))
+    return f"{res['name']}[{params}]"
+
+def format_result(res):
+    return (f"{result_key(res):<60} {res['time']*1e3:10.2f} ms "
+            f"{res['pixels_per_s']/1e6:10.2f} Mpx/s "
+            f"{res['peak_mem']/2**20:10.2f} MiB")
+
+def save_results(results, outdir):
+    meta = get_metadata()
+    os.makedirs(outdir, exist_ok=True)
+    fname = os.path.join(outdir, f"bench_{meta['revision']}_"
+                                 f"{meta['date'].replace(':', '')}.json")
+    with open(fname, 'w') as f:
+        json.dump({'meta' : meta, 'results' : results}, f, indent=1)
+    return fname
+
+def compare_results(fname_a, fname_b, log=print):
+    """
+    Print the speed and memory ratios of two stored runs. Ratios above
+    1 mean that the second run is faster or uses less memory.
+    """
+    runs = []
+    for fname in (fname_a, fname_b):
+        with open(fname) as f:
+            runs.append(json.load(f))
+    a = {result_key(r) : r for r in runs[0]['results']}
+    b = {result_key(r) : r for r in runs[1]['results']}
+
+    log(f"{'':<60} {runs[0]['meta']['revision']:>10} -> "
+        f"{runs[1]['meta']['revision']:<10}")
+    for key in a:
+        if key not in b:
+            continue
+        speedup = a[key]['time'] / b[key]['time']
+        mem = a[key]['peak_mem'] / max(b[key]['peak_mem'], 1)
+        log(f"{key:<60} {speedup:8.2f}x time {mem:8.2f}x memory")
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m newton.bench',
+                                     description=__doc__.strip().split('\n')[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='Run the benchmarks')
+    run.add_argument('--quick', action='store_true',
+                     help='Only run the smallest cases')
+    run.add_argument('--filter', nargs='*', default=None,
+                     help='Names of the benchmarks to run')
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--out', default='./out/bench/',
+                     help='Directory of the stored results')
+
+    cmp = sub.add_parser('compare', help='Compare two stored runs')
+    cmp.add_argument('old')
+    cmp.add_argument('new')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        results = run_suite(SWEEP_QUICK if args.quick else SWEEP,
+                            names=args.filter, repeat=args.repeat)
+        print(f'Results saved to {save_results(results, args.out)}')
+    else:
+        compare_results(args.old, args.new)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import os
+import json
+import hashlib
+import numpy as np
+from functools import partial
+
+from .newton import *
+from .backends import check_backend
+from .symmetry import NR_render_symmetric
+
+# Tag of the code that produced the cached results. Increment it
+# whenever a change in the package changes the rendered results.
+CACHE_VERSION = 5
+
+cache_settings = {
+    'enabled'   : True,
+    'dir'       : './out/cache/',
+    'max_bytes' : 512 * 2**20,
+}
+
+def set_cache(enabled=None, cache_dir=None, max_bytes=None):
+    """
+    Change the settings of the render cache.
+
+    Parameters:
+    -----------
+    enabled : bool, optional
+      Whether the render functions should consult the cache.
+    cache_dir : str, optional
+      Directory of the cached results.
+    max_bytes : int, optional
+      Size limit of the cache directory. Results used the least
+      recently are deleted first when it is exceeded.
+    """
+    if enabled is not None: cache_settings['enabled'] = enabled
+    if cache_dir is not None: cache_settings['dir'] = cache_dir
+    if max_bytes is not None: cache_settings['max_bytes'] = max_bytes
+
+def cache_key(kind, P, params):
+    """
+    Content hash of a render: the type of the result, the coefficients
+    of the polynomial, the render parameters and the code version.
+    """
+    c = np.ascontiguousarray(P.coeff_())
+    h = hashlib.sha256()
+    h.update(f'{kind}|{CACHE_VERSION}|{c.dtype.str}'.encode())
+    h.update(c.tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    return h.hexdigest()
+
+def _cache_files(cache_dir, ext='.npz'):
+    files = []
+    for f in os.listdir(cache_dir):
+        if f.endswith(ext):
+            st = os.stat(os.path.join(cache_dir, f))
+            files.append((st.st_mtime, st.st_size, f))
+    return sorted(files)
+
+def _evict(cache_dir, max_bytes, ext='.npz'):
+    """
+    Delete the least recently used files of a cache directory until
+    their total size is below `max_bytes`. Returns the remaining size.
+    """
+    files = _cache_files(cache_dir, ext=ext)
+    total = sum(size for _, size, _ in files)
+    for _, size, f in files:
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, f))
+        total -= size
+    return total
+
+def cache_clear():
+    cache_dir = cache_settings['dir']
+    if os.path.isdir(cache_dir):
+        _evict(cache_dir, 0)
+
+def cached(kind, P, params, compute):
+    """
+    Look up a result in the cache or compute and store it.
+
+    Parameters:
+    -----------
+    kind : str
+      Type of the result.
+    P : Polynomial
+      The rendered polynomial.
+    params : dict
+      Every other input that the result depends on.
+    compute : callable
+      Called without arguments on a cache miss. Should return a dict of
+      numpy arrays.
+
+    Returns:
+    --------
+    result : dict
+      The arrays returned by `compute`.
+    """
+    if not cache_settings['enabled']:
+        return compute()
+
+    cache_dir = cache_settings['dir']
+    path = os.path.join(cache_dir, cache_key(kind, P, params) + '.npz')
+
+    if os.path.exists(path):
+        with np.load(path) as f:
+            result = {k : f[k] for k in f.files}
+        # The modification time marks the last use of the file
+        os.utime(path)
+        return result
+
+    result = compute()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez_compressed(f, **result)
+    os.replace(tmp, path)
+    _evict(cache_dir, cache_settings['max_bytes'])
+
+    return result
+
+def _scheme_key(scheme):
+    """
+    Name of an iteration scheme that is stable between sessions.
+    """
+    if scheme is None or isinstance(scheme, str):
+        return scheme or 'newton'
+    if isinstance(scheme, partial):
+        kwargs = sorted((k, repr(v)) for k, v in scheme.keywords.items())
+        return f'{_scheme_key(scheme.func)}{kwargs}'
+    for name, (delta, _) in SCHEMES.items():
+        if scheme is delta:
+            return name
+    return f'{scheme.__module__}.{scheme.__qualname__}'
+
+def NR_render_cached(P, N, n_steps=10,
+                     grid_lim_x=None, grid_lim_y=None,
+                     tol=None, backend=None, dtype=np.complex128,
+                     scheme=None):
+    """
+    Cached version of `NR_render_tiled` with in-memory outputs. Only the
+    fundamental region of the symmetries of the image is computed (see
+    `NR_render_symmetric`). The backend is part of the key, as the
+    backends only give identical results in double precision (see
+    `tests/test_backends.py`).
+
+    Returns:
+    --------
+    basin, n_iter : numpy.ndarray
+      Basin indices and step counts of the pixels.
+    """
+    if grid_lim_x is None: grid_lim_x = NR_missing_grid_lim(P)
+    if grid_lim_y is None: grid_lim_y = NR_missing_grid_lim(P)
+
+    def compute():
+        basin, n_iter = NR_render_symmetric(P, N, n_steps,
+                                            grid_lim_x=grid_lim_x,
+                                            grid_lim_y=grid_lim_y,
+                                            tol=tol, backend=backend,
+                                            dtype=dtype, scheme=scheme)
+        return {'basin' : basin, 'n_iter' : n_iter}
+
+    params = {'N' : N, 'n_steps' : n_steps, 'tol' : tol,
+              'dtype' : np.dtype(dtype).str,
+              'scheme' : _scheme_key(scheme),
+              'backend' : check_backend(backend),
+              'grid_lim_x' : [float(g) for g in grid_lim_x],
+              'grid_lim_y' : [float(g) for g in grid_lim_y]}
+    result = cached('basins', P, params, compute)
+    return result['basin'], result['n_iter']
@@ -0,0 +1,292 @@
+import warnings
+import numpy as np
+
+try:
+    import mpmath
+except ImportError:
+    mpmath = None
+
+from .newton import *
+from .render import get_shape
+
+#######
+#
+#    HIGH-PRECISION REFERENCE ORBIT
+#
+##########################################################################
+
+def _taylor_coeffs(c, z):
+    """
+    Taylor coefficients `P^(k)(z) / k!` of a polynomial around `z` in
+    ascending order, by repeated synthetic division. `c` contains the
+    coefficients in descending order.
+    """
+    b = list(c)
+    d = len(b) - 1
+    a = []
+    for k in range(d + 1):
+        for j in range(1, d + 1 - k):
+            b[j] += z * b[j-1]
+        a.append(b[d-k])
+    return a
+
+def NR_reference_orbit(P, z_0, n_steps, prec):
+    """
+    Iterate a single point with the Newton-Raphson method in arbitrary
+    precision and collect the Taylor coefficients of `P` along the orbit.
+
+    Parameters:
+    -----------
+    P : Polynomial
+      The polynomial to find the roots of.
+    z_0 : mpmath.mpc
+      Starting point of the reference orbit.
+    n_steps : int
+      Number of steps.
+    prec : int
+      Working precision in bits.
+
+    Returns:
+    --------
+    T : numpy.ndarray
+      Taylor coefficients of `P` around the points of the orbit rounded
+      to double precision, with shape `(n_steps, deg + 1)`.
+    Z : numpy.ndarray
+      Points of the orbit rounded to double precision (`n_steps + 1`).
+    """
+    with mpmath.workprec(prec):
+        c = [mpmath.mpc(complex(c_)) for c_ in P.coeff_()]
+        z = mpmath.mpc(z_0)
+        eps = mpmath.mpf(2) ** (-prec)
+
+        T = np.empty((n_steps, len(c)), dtype=complex)
+        Z = np.empty(n_steps + 1, dtype=complex)
+        Z[0] = complex(z)
+        for n in range(n_steps):
+            a = _taylor_coeffs(c, z)
+            T[n] = [complex(a_) for a_ in a]
+            if a[1] == 0:
+                raise ZeroDivisionError("The reference orbit hit a "
+                                        "critical point of the polynomial!")
+            dz = a[0] / a[1]
+            z -= dz
+            Z[n+1] = complex(z)
+
+            # A converged reference stays in place for the rest of the steps
+            if abs(dz) <= eps * max(abs(z), 1):
+                T[n+1:] = T[n]
+                Z[n+2:] = Z[n+1]
+                break
+    return T, Z
+
+
+
+#######
+#
+#    PERTURBATION ITERATION
+#
+##########################################################################
+
+def _perturbation_terms(a, d):
+    """
+    Evaluate `dA = P(Z+d) - P(Z)`, `dB = P'(Z+d) - P'(Z)` and
+    `P''(Z+d)` from the Taylor coefficients `a` of `P` around `Z`.
+    """
+    deg = a.size - 1
+    # Horner schemes of the three series, without their `d^0` terms
+    s_A = np.full(d.shape, a[deg], dtype=complex)
+    s_B = np.full(d.shape, deg * a[deg], dtype=complex)
+    s_C = np.full(d.shape, deg * (deg-1) * a[deg], dtype=complex)
+    for k in range(deg-1, 1, -1):
+        s_A = s_A*d + a[k]
+        s_B = s_B*d + k*a[k]
+        s_C = s_C*d + k*(k-1)*a[k]
+    if deg >= 2:
+        s_A = s_A*d + a[1]
+    else:
+        s_B, s_C = np.zeros_like(d), np.zeros_like(d)
+    return d*s_A, d*s_B, s_C
+
+def NR_iter_perturbed(T, Z, d_0, n_steps, tol=1e-8,
+                      scale=1.0, glitch_tol=1e-3):
+    """
+    Iterate points given by their offsets `d_0` from the starting point
+    of a reference orbit, by only tracking the offsets in double
+    precision.
+
+    With `z = Z + d` the offsets are updated as
+    `d' = d - (B dA - A dB) / (B (B + dB))`, where `A = P(Z)`,
+    `B = P'(Z)` and `dA`, `dB` are the changes of these at `z`.
+
+    A point is marked as glitched, if the rounding error of its offset
+    grows larger than `glitch_tol` times the distance of neighbouring
+    points on its orbit (estimated from the derivative of the orbit and
+    the pixel size `scale`), because then the offset can't tell the
+    point apart from its neighbours anymore. It is also glitched, if
+    `|Z + d|` drops below `glitch_tol` times `|Z|` or `|d|`. The orbit
+    of the point is then far from the reference orbit, and the terms of
+    the update cancel below double precision.
+
+    Returns:
+    --------
+    z : numpy.ndarray
+      Final positions of the points rounded to double precision.
+    n_iter : numpy.ndarray
+      Number of steps taken by every point, or `n_steps + 1` for the
+      points that did not converge.
+    glitched : numpy.ndarray
+      Mask of the points that have to be recomputed with another
+      reference orbit.
+    """
+    eps = np.finfo(float).eps
+
+    z = np.empty(d_0.shape, dtype=complex)
+    n_iter = np.full(d_0.shape, n_steps + 1, dtype=iter_dtype(n_steps))
+    glitched = np.zeros(d_0.shape, dtype=bool)
+
+    active = np.arange(d_0.size)
+    d = d_0.reshape(-1).astype(complex)
+    J = np.ones_like(d)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for n in range(n_steps):
+            A, B = T[n,0], T[n,1]
+            dA, dB, C = _perturbation_terms(T[n], d)
+            B_d = B + dB
+
+            step = (A + dA) / B_d
+            d = d - (B*dA - A*dB) / (B*B_d)
+            J = J * (A + dA) * C / B_d**2
+
+            finite = np.isfinite(d)
+            conv = finite & (np.abs(step) < tol)
+            # The offset cancels the reference point, when the orbit of
+            # the point gets far from the reference orbit
+            d_abs = np.abs(d)
+            far = (np.abs(Z[n+1] + d) <
+                   glitch_tol * np.maximum(d_abs, abs(Z[n+1])))
+            glitch = ~conv & (~finite | far |
+                              (eps * d_abs > glitch_tol*np.abs(J)*scale))
+            n_iter.flat[active[conv]] = n + 1
+            glitched.flat[active[glitch]] = True
+
+            done = conv | glitch
+            if np.any(done) or (n == n_steps-1):
+                z.flat[active[done]] = Z[n+1] + d[done]
+                keep = ~done
+                active, d, J = active[keep], d[keep], J[keep]
+            if active.size == 0:
+                break
+        z.flat[active] = Z[n_steps] + d
+
+    return z, n_iter, glitched
+
+
+
+#######
+#
+#    DEEP-ZOOM RENDERING
+#
+##########################################################################
+
+def NR_render_deep(P, center, width, N, n_steps=100, tol=1e-8,
+                   prec=None, glitch_tol=1e-3, max_refs=20):
+    """
+    Render a Newton-Raphson fractal at zoom levels beyond the reach of
+    double precision by perturbation iteration.
+
+    Only a single reference point is iterated in arbitrary precision,
+    every pixel is iterated as a double precision offset from it (see
+    `NR_iter_perturbed`). Glitched pixels are iterated again with a new
+    reference point picked from among them, at most `max_refs` times.
+    References that hit a critical point of `P` (eg. the center of
+    `z^3 - 1`) are moved off it by a pixel.
+
+    Parameters:
+    -----------
+    P : Polynomial
+      The polynomial to find the roots of.
+    center : str, complex or mpmath.mpc
+      Center of the window. Use strings (eg. `'-0.52+1.23e-40j'`) or
+      `mpmath.mpc` values to specify it in more than double precision.
+    width : float
+      Width of the window on the real axis.
+    N : int or tuple
+      Side length of the image or its `(rows, cols)` shape.
+    n_steps : int
+      Maximum number of steps.
+    tol : float
+      Step-length threshold for convergence.
+    prec : int or None
+      Precision of the reference orbits in bits. By default, it is set
+      from the width of the window.
+    glitch_tol : float
+      Threshold of the glitch detection.
+    max_refs : int
+      Maximum number of reference orbits. A `RuntimeWarning` is issued
+      if some pixels are still glitched after all of them.
+
+    Returns:
+    --------
+    basin : numpy.ndarray
+      Basin index of every pixel, with the first row at the top.
+    n_iter : numpy.ndarray
+      Number of steps taken by every pixel.
+    """
+    if mpmath is None:
+        raise ImportError("Deep-zoom rendering needs the `mpmath` package!")
+    if prec is None:
+        prec = 64 + max(0, int(-np.log2(width)))
+
+    ny, nx = get_shape(N)
+    height = width * (ny - 1) / max(nx - 1, 1)
+    with mpmath.workprec(prec):
+        center = mpmath.mpc(center)
+    d_x = np.linspace(-width/2, width/2, nx)
+    d_y = np.linspace(height/2, -height/2, ny)
+    d_0 = (d_x[None, :] + d_y[:, None]*1j).reshape(-1)
+    scale = width / max(nx - 1, 1)
+
+    z = np.empty(d_0.size, dtype=complex)
+    n_iter = np.empty(d_0.size, dtype=iter_dtype(n_steps))
+
+    # Offsets of the pixels to render from the current reference point
+    todo = np.arange(d_0.size)
+    d_ref = 0j
+    for i in range(max_refs):
+        while True:
+            with mpmath.workprec(prec):
+                z_ref = center + mpmath.mpc(d_ref)
+            try:
+                T, Z = NR_reference_orbit(P, z_ref, n_steps, prec)
+                break
+            except ZeroDivisionError:
+                # Move the reference off the critical point by a pixel
+                d_ref += scale
+
+        z_t, n_t, glitched = NR_iter_perturbed(T, Z, d_0[todo] - d_ref,
+                                               n_steps, tol=tol,
+                                               scale=scale,
+                                               glitch_tol=glitch_tol)
+        z[todo], n_iter[todo] = z_t, n_t
+        if not np.any(glitched):
+            break
+        if i == max_refs-1:
+            warnings.warn(f"{np.count_nonzero(glitched)} pixels are still "
+                          f"glitched after {max_refs} reference orbits. "
+                          "Increase `max_refs` or `prec`.", RuntimeWarning)
+            break
+
+        # Pick the glitched pixel closest to their mean as new reference
+        todo = todo[glitched]
+        d_g = d_0[todo]
+        d_ref = d_g[np.argmin(np.abs(d_g - d_g.mean()))]
+
+    basin = closest_roots(z, P.roots())
+    return basin.reshape(ny, nx), n_iter.reshape(ny, nx)
+
+def NR_deep_zoom_widths(width_s, width_e, n=50):
+    """
+    Widths of the frames of a deep zoom, with a constant zoom factor
+    between consecutive frames.
+    """
+    return np.geomspace(width_s, width_e, n)
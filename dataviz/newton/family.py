@@ -0,0 +1,220 @@
+import numpy as np
+
+from .newton import *
+from .render import get_shape, get_grid_axes
+
+#######
+#
+#    BATCHED POLYNOMIAL ALGEBRA
+#
+##########################################################################
+
+def family_roots(C):
+    """
+    Roots of a batch of polynomials of the same degree, from the
+    eigenvalues of their stacked companion matrices.
+
+    Parameters:
+    -----------
+    C : numpy.ndarray
+      Coefficients in descending order, with shape `(..., deg + 1)`.
+      The leading coefficients can't be 0.
+
+    Returns:
+    --------
+    roots : numpy.ndarray
+      Roots with shape `(..., deg)`, sorted by their complex argument,
+      so that the order is consistent between neighbouring members.
+    """
+    C = np.asarray(C)
+    d = C.shape[-1] - 1
+    M = np.zeros(C.shape[:-1] + (d, d), dtype=np.result_type(C, float))
+    M[..., 0, :] = -C[..., 1:] / C[..., :1]
+    M[..., np.arange(1, d), np.arange(d-1)] = 1
+    roots = np.linalg.eigvals(M)
+    return np.take_along_axis(roots, np.argsort(np.angle(roots), axis=-1),
+                              axis=-1)
+
+def family_derivative(C, k=1):
+    """
+    Coefficients of the `k`-th derivatives of a batch of polynomials.
+    """
+    C = np.asarray(C)
+    for _ in range(k):
+        d = C.shape[-1] - 1
+        C = C[..., :-1] * np.arange(d, 0, -1)
+    return C
+
+def _NR_iter_family(C, z, fam, n_steps, tol=None):
+    """
+    Newton-Raphson iteration of points `z`, where the point `z[i]`
+    belongs to the polynomial with coefficients `C[fam[i]]`. Converged
+    points are dropped from the iteration, like in `NR_iter_active`.
+    """
+    d = C.shape[1] - 1
+    z = np.array(z, dtype=complex)
+    # Points that did not converge are marked with `n_steps + 1`
+    n_iter = np.full(z.shape, n_steps + (tol is not None),
+                     dtype=iter_dtype(n_steps))
+
+    active = np.arange(z.size)
+    Z, F = z.copy(), fam
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for i in range(n_steps):
+            # Fused Horner scheme with the coefficients of each point
+            p = C[F, 0].astype(complex)
+            dp = np.zeros_like(p)
+            for k in range(1, d + 1):
+                dp = dp*Z + p
+                p = p*Z + C[F, k]
+            dZ = p / dp
+            finite = np.isfinite(dZ)
+            Z[finite] -= dZ[finite]
+            if tol is None:
+                continue
+
+            done = np.abs(dZ) < tol
+            n_iter[active[done]] = i + 1
+            done |= ~finite
+            if np.any(done):
+                z[active[done]] = Z[done]
+                keep = ~done
+                active, Z, F = active[keep], Z[keep], F[keep]
+            if active.size == 0:
+                break
+    z[active] = Z
+
+    return z, n_iter
+
+def _closest_family_roots(z, fam, roots):
+    """
+    Index of the closest root of their own polynomial for every point.
+    """
+    closest = np.empty(z.size, dtype=basin_dtype(roots.shape[1]))
+    chunk = max(1, CHUNK_MEM // (roots.shape[1] * 24))
+    for i in range(0, z.size, chunk):
+        s = slice(i, i+chunk)
+        closest[s] = np.argmin(np.abs(z[s, None] - roots[fam[s]]), axis=1)
+    return closest
+
+
+
+#######
+#
+#    FAMILY RENDERING
+#
+##########################################################################
+
+def NR_family_basins(C, N, n_steps=30,
+                     grid_lim_x=(-2, 2), grid_lim_y=(-2, 2),
+                     tol=1e-8, max_mem=CHUNK_MEM):
+    """
+    Render the basins of attraction of a whole family of polynomials on
+    the same window in a single vectorized pass.
+
+    Parameters:
+    -----------
+    C : array-like
+      Coefficients of the members in descending order with shape
+      `(..., deg + 1)`, eg. a 2D grid of coefficient vectors.
+    N : int or tuple
+      Side length of the images or their `(rows, cols)` shape.
+    n_steps : int
+      Number of steps, or the maximum number of steps if `tol` is given.
+    grid_lim_x, grid_lim_y : tuple
+      Limits of the rendered window on the complex plane.
+    tol : float or None
+      Convergence threshold for the iteration.
+    max_mem : int
+      Approximate memory ceiling of the points iterated at once in
+      bytes. The members are processed in batches that fit.
+
+    Returns:
+    --------
+    basin : numpy.ndarray
+      Stack of basin maps with shape `C.shape[:-1] + (rows, cols)`. The
+      indices refer to the roots returned by `family_roots(C)`.
+    n_iter : numpy.ndarray
+      Number of steps taken by every pixel, with the same shape. Pixels
+      that did not converge have `n_steps + 1` (see `NR_iter_active`).
+    """
+    C = np.asarray(C)
+    batch_shape, d = C.shape[:-1], C.shape[-1] - 1
+    C = C.reshape(-1, d + 1)
+    roots = family_roots(C)
+
+    ny, nx = get_shape(N)
+    x, y = get_grid_axes(N, grid_lim_x, grid_lim_y)
+    Z = (x[None, :] + y[:, None]*1j).reshape(-1)
+
+    basin = np.empty((C.shape[0], Z.size), dtype=basin_dtype(d))
+    n_iter = np.empty((C.shape[0], Z.size), dtype=iter_dtype(n_steps))
+
+    # About 8 complex arrays of the size of the batch are alive at once
+    batch = max(1, int(max_mem // (8 * 16 * Z.size)))
+    for i in range(0, C.shape[0], batch):
+        members = np.arange(i, min(i + batch, C.shape[0]))
+        fam = np.repeat(members, Z.size)
+        z, n = _NR_iter_family(C, np.tile(Z, members.size), fam,
+                               n_steps, tol=tol)
+        basin[members] = _closest_family_roots(z, fam, roots)\
+                         .reshape(members.size, -1)
+        n_iter[members] = n.reshape(members.size, -1)
+
+    shape = batch_shape + (ny, nx)
+    return basin.reshape(shape), n_iter.reshape(shape)
+
+def NR_parameter_plane(family, c, n_steps=50, tol=1e-8,
+                       z_0=None, crit=0):
+    """
+    Parameter-plane image of a polynomial family: iterate a single
+    starting point (by default a free critical point of the Newton map)
+    for every parameter value `c` at once.
+
+    For the members where the critical point does not converge to a
+    root in `n_steps` steps, the Newton map has attracting cycles, ie.
+    open sets of starting points that never find a root.
+
+    Parameters:
+    -----------
+    family : callable
+      Function mapping an array of parameters to an array of
+      coefficient vectors with shape `c.shape + (deg + 1,)`. Eg. for
+      `z^n + c z - 1`: `lambda c: np.stack([np.ones_like(c), ...,
+      c, -np.ones_like(c)], axis=-1)`.
+    c : array-like
+      Parameter values, eg. a 2D grid of complex numbers.
+    n_steps : int
+      Maximum number of steps.
+    tol : float
+      Convergence threshold for the iteration.
+    z_0 : complex, array-like or None
+      Starting points. If `None`, the roots of `P''` (the free critical
+      points of the Newton map) are used.
+    crit : int
+      Index of the root of `P''` used as starting point, if there are
+      more. The roots are sorted by their complex argument.
+
+    Returns:
+    --------
+    n_iter : numpy.ndarray
+      Number of steps taken for every parameter value, or `n_steps + 1`
+      where the starting point did not converge.
+    basin : numpy.ndarray
+      Index of the root (see `family_roots`) that the starting point
+      converged to (or ended up closest to).
+    """
+    c = np.asarray(c)
+    C = np.asarray(family(c)).reshape(c.size, -1)
+    roots = family_roots(C)
+
+    if z_0 is None:
+        C_2 = family_derivative(C, k=2)
+        assert C_2.shape[1] > 1, "The family should be at least cubic!"
+        z_0 = family_roots(C_2)[:, crit].reshape(c.shape)
+    z_0 = np.broadcast_to(np.asarray(z_0, dtype=complex), c.shape).reshape(-1)
+
+    fam = np.arange(c.size)
+    z, n_iter = _NR_iter_family(C, z_0, fam, n_steps, tol=tol)
+    basin = _closest_family_roots(z, fam, roots)
+    return n_iter.reshape(c.shape), basin.reshape(c.shape)
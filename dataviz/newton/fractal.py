@@ -1,3 +1,4 @@
+import os
 import numpy as np
 
 import seaborn as sns
@@ -5,6 +6,10 @@ import matplotlib.cm as cm
 import matplotlib.pyplot as plt
 
 from .newton import *
+from .cache import cached, NR_render_cached
+from .render import get_grid_axes, NR_render_progressive
+from .analytic import NR_render_analytic
+from .image import get_lut, NR_rgba
 
 from ._util import NR_complex_fig_setup
 
@@ -104,13 +109,13 @@ def NR_fractal_steps_reversed(P, N=100,
     fig, axes = NR_complex_fig_setup(nrows=2, ncols=3,
                                      grid_lim=grid_lim, axis=False)
 
-    # Plot NR steps with scatter points
+    # Plot NR steps with scatter points. The grid is iterated only once,
+    # and every panel is drawn when the iteration reaches its step count
     X_0 = get_starting_grid(N, grid_lim, grid_lim)
-    ax = NR_fractal_ax(axes[0], X=X_0, P=P, X_c=X_0)
-
-    for i in range(1, len(axes)):
-        X_N = NR_iter(P, X_0, steps[i-1])
-        ax = NR_fractal_ax(axes[i], X=X_0, P=P, X_c=X_N)
+    panels = {n : ax for n, ax in zip([0, *steps], axes)}
+    NR_snapshots(P, X_0, panels,
+                 callback=lambda n, X_N : NR_fractal_ax(panels[n], X=X_0,
+                                                        P=P, X_c=X_N))
 
     fig.suptitle('Fig. 8. Newton$-$Raphson fractal on a grid of points',
                  fontsize=20, fontweight='bold', y=0.07)
@@ -131,6 +136,14 @@ def NR_fractal_image_ax(ax, P, X_c,
     return ax
 
 
+def NR_fractal_basin_ax(ax, P, basin,
+                        grid_lim_x, grid_lim_y):
+
+    colors = NR_rgba(basin, get_lut(len(P.roots())))
+    ax.imshow(colors, extent=(*grid_lim_x, *grid_lim_y))
+    return ax
+
+
 def NR_fractal_steps_image(P, N=100,
                            steps=[1,3,6,10,15],
                            grid_lim=None):
@@ -140,15 +153,21 @@ def NR_fractal_steps_image(P, N=100,
     fig, axes = NR_complex_fig_setup(nrows=2, ncols=3,
                                      grid_lim=grid_lim, axis=False)
 
-    # Plot NR steps with scatter points
-    X_0 = get_starting_grid(N, grid_lim, grid_lim)
-    ax = NR_fractal_image_ax(ax=axes[0], P=P, X_c=X_0,
-                             grid_lim_x=grid_lim, grid_lim_y=grid_lim)
-
-    for i in range(1, len(axes)):
-        X_N = NR_iter(P, X_0, steps[i-1])
-        ax = NR_fractal_image_ax(axes[i], P=P, X_c=X_N,
-                                 grid_lim_x=grid_lim, grid_lim_y=grid_lim)
+    # Plot NR steps as images of the basins, taken from a single run.
+    # Results of earlier calls with the same inputs are read from the
+    # render cache
+    panels = {n : ax for n, ax in zip([0, *steps], axes)}
+    def compute():
+        x, y = get_grid_axes(N, grid_lim, grid_lim)
+        snapshots = NR_snapshots(P, x + y[:,None]*1j, panels, basins=True)
+        return {f'step_{n}' : basin for n, basin in snapshots.items()}
+
+    params = {'N' : N, 'steps' : [int(n) for n in panels],
+              'grid_lim' : [float(g) for g in grid_lim]}
+    snapshots = cached('snapshots', P, params, compute)
+    for n, ax in panels.items():
+        NR_fractal_basin_ax(ax, P=P, basin=snapshots[f'step_{n}'],
+                            grid_lim_x=grid_lim, grid_lim_y=grid_lim)
 
     fig.suptitle('Fig. 9. Newton$-$Raphson factal now on a fine grid',
                  fontsize=20, fontweight='bold', y=0.07)
@@ -156,14 +175,15 @@ def NR_fractal_steps_image(P, N=100,
 
 
 def NR_fractal_plot(P, N=512, n_steps=10,
-                    grid_lim=None):
+                    grid_lim=None, tol=None):
 
     fig, axes = NR_complex_fig_setup(nrows=1, ncols=1,
                                      grid_lim=grid_lim, axis=False)
 
-    X_0 = get_starting_grid(N, grid_lim, grid_lim)
-    X_N = NR_iter(P, X_0, n_steps)
-    ax = NR_fractal_image_ax(ax=axes[0], P=P, X_c=X_N,
+    basin, _ = NR_render_cached(P, N, n_steps,
+                                grid_lim_x=grid_lim, grid_lim_y=grid_lim,
+                                tol=tol)
+    ax = NR_fractal_basin_ax(ax=axes[0], P=P, basin=basin,
                              grid_lim_x=grid_lim, grid_lim_y=grid_lim)
 
     fig.suptitle('Fig. 10. A Newton$-$Raphson fractal',
@@ -175,6 +195,7 @@ def NR_fractal(P,
                N=150, n_steps=10, figsize=(10,10),
                grid_lim_x=None,
                grid_lim_y=None,
+               tol=None, dtype=np.complex128, scheme=None,
                axis=True, show=True,
                save=False, savedir='./out/'):
 
@@ -186,14 +207,118 @@ def NR_fractal(P,
     if not axis:
         ax.axis('off')
 
-    X_0 = get_starting_grid(N, grid_lim_x, grid_lim_y[::-1])
-    X_N = NR_iter(P, X_0, n_steps)
-    ax = NR_fractal_image_ax(ax=ax, P=P, X_c=X_N,
+    # The grid is iterated tile by tile, so only the basin indices of
+    # the whole image are held in memory. With a tolerance given,
+    # converged points are dropped from the iteration early and
+    # `n_steps` only acts as an upper limit. Results of earlier calls
+    # with the same inputs are read from the render cache
+    basin, _ = NR_render_cached(P, N, n_steps,
+                                grid_lim_x=grid_lim_x, grid_lim_y=grid_lim_y,
+                                tol=tol, dtype=dtype, scheme=scheme)
+    ax = NR_fractal_basin_ax(ax=ax, P=P, basin=basin,
                              grid_lim_x=grid_lim_x, grid_lim_y=grid_lim_y)
 
     gxl, gxr = grid_lim_x
     gyl, gyr = grid_lim_y
     fname = f'nrfractal|N{N}|ns{n_steps}|x{gxl}_{gxr}|y{gyl}_{gyr}.'
+    if isinstance(scheme, str) and scheme != 'newton':
+        fname = f'nrfractal|{scheme}' + fname[len('nrfractal'):]
+    if save:
+        os.makedirs(savedir, exist_ok=True)
+        plt.savefig(savedir + fname + figsave_fmt,
+                    format=figsave_fmt,
+                    dpi=figsave_dpi,
+                    bbox_inches='tight')
+
+    if show:
+        plt.show()
+    else:
+        plt.clf()
+        plt.close('all')
+
+def NR_fractal_progressive(P,
+                           N=512, n_steps=30, figsize=(10,10),
+                           grid_lim_x=None,
+                           grid_lim_y=None,
+                           tol=1e-8, levels=(16, 4, 1),
+                           axis=True):
+
+    # Updating the same output in place needs a running IPython kernel
+    # (eg. in Jupyter). Elsewhere the figure window is redrawn instead
+    try:
+        from IPython import get_ipython
+        from IPython.display import display
+        if getattr(get_ipython(), 'kernel', None) is None:
+            display = None
+    except ImportError:
+        display = None
+
+    if grid_lim_x is None: grid_lim_x = NR_missing_grid_lim(P)
+    if grid_lim_y is None: grid_lim_y = NR_missing_grid_lim(P)
+
+    fig, ax = plt.subplots(nrows=1, ncols=1, figsize=figsize)
+    ax.set_aspect('equal')
+    if not axis:
+        ax.axis('off')
+
+    lut = get_lut(len(P.roots()))
+    im, handle = None, None
+    # Interrupting the kernel stops the generator, so the finer levels
+    # are not computed anymore
+    for s, basin, _ in NR_render_progressive(P, N, n_steps,
+                                             grid_lim_x=grid_lim_x,
+                                             grid_lim_y=grid_lim_y,
+                                             tol=tol, levels=levels):
+        colors = NR_rgba(basin, lut)
+        if im is None:
+            im = ax.imshow(colors, extent=(*grid_lim_x, *grid_lim_y))
+        else:
+            im.set_data(colors)
+        ax.set_title(f'Stride {s}', fontsize=20, fontweight='bold')
+
+        if display is None:
+            plt.pause(0.001)
+        elif handle is None:
+            handle = display(fig, display_id=True)
+        else:
+            handle.update(fig)
+
+    if display is None:
+        plt.show()
+    else:
+        # The displayed output keeps the image, the figure is not needed
+        plt.close(fig)
+
+
+def NR_fractal_analytic(F,
+                        N=512, n_steps=50, figsize=(10,10),
+                        grid_lim_x=None,
+                        grid_lim_y=None,
+                        tol=1e-8, dtype=np.complex128,
+                        axis=True, show=True,
+                        save=False, savedir='./out/'):
+
+    if grid_lim_x is None: grid_lim_x = F.grid_lim_x
+    if grid_lim_y is None: grid_lim_y = F.grid_lim_y
+
+    fig, ax = plt.subplots(nrows=1, ncols=1, figsize=figsize)
+    ax.set_aspect('equal')
+    if not axis:
+        ax.axis('off')
+
+    # The roots are not known in advance, so they are collected from
+    # the converged pixels of the render
+    basin, _, roots = NR_render_analytic(F, N, n_steps,
+                                         grid_lim_x=grid_lim_x,
+                                         grid_lim_y=grid_lim_y,
+                                         tol=tol, dtype=dtype)
+    colors = NR_rgba(basin, get_lut(max(len(roots), 1)))
+    ax.imshow(colors, extent=(*grid_lim_x, *grid_lim_y))
+    ax.set_title(f'${F.f_str()}$', fontsize=20, fontweight='bold')
+
+    gxl, gxr = grid_lim_x
+    gyl, gyr = grid_lim_y
+    fname = f'nrfractal|{F.name}|N{N}|ns{n_steps}|x{gxl}_{gxr}|y{gyl}_{gyr}.'
     if save:
         os.makedirs(savedir, exist_ok=True)
         plt.savefig(savedir + fname + figsave_fmt,
@@ -205,4 +330,4 @@ def NR_fractal(P,
         plt.show()
     else:
         plt.clf()
-        plt.close('all')
\ No newline at end of file
+        plt.close('all')
@@ -0,0 +1,242 @@
+import numpy as np
+import matplotlib.image as mpimg
+from functools import lru_cache
+
+from .newton import *
+from .cache import NR_render_cached
+from .render import get_grid_axes, NR_render_tile
+
+#######
+#
+#    COLOR LOOKUP TABLES
+#
+##########################################################################
+
+@lru_cache(maxsize=32)
+def get_lut(n_roots, n_shades=1, shade_min=0.35):
+    """
+    Lookup table of uint8 RGBA colors for every basin and shade level.
+
+    The basin colors are the same as the ones of `get_basin_colors`.
+    The shade levels darken them linearly from the full color (fastest
+    convergence) to `shade_min` times the color (slowest convergence).
+
+    Returns:
+    --------
+    lut : numpy.ndarray
+      Read-only table with shape `(n_roots, n_shades, 4)`.
+    """
+    cmap = get_cmap()
+    base = cmap(np.arange(n_roots) / n_roots)
+    shade = np.linspace(1, shade_min, n_shades) if n_shades > 1 else np.ones(1)
+
+    lut = np.empty((n_roots, n_shades, 4))
+    lut[..., :3] = base[:, None, :3] * shade[None, :, None]
+    lut[..., 3] = base[:, None, 3]
+    lut = (lut * 255 + 0.5).astype(np.uint8)
+    lut.setflags(write=False)
+    return lut
+
+def NR_rgba(basin, lut, n_iter=None, n_steps=None, out=None, chunk=256):
+    """
+    Map basin indices (and optionally step counts) through a lookup
+    table straight into an `(rows, cols, 4)` uint8 RGBA image.
+
+    Parameters:
+    -----------
+    basin : numpy.ndarray
+      2D array of basin indices.
+    lut : numpy.ndarray
+      Lookup table from `get_lut`.
+    n_iter : numpy.ndarray, optional
+      Step counts of the pixels, used to select the shade level.
+    n_steps : int, optional
+      Step count mapped to the darkest shade. Defaults to the maximum
+      of `n_iter`.
+    out : numpy.ndarray, optional
+      Output image, eg. a memory map of an image larger than the memory.
+    chunk : int
+      Number of rows colored at once.
+    """
+    n_shades = lut.shape[1]
+    lut_f = lut.reshape(-1, 4)
+    if out is None:
+        out = np.empty(basin.shape + (4,), dtype=np.uint8)
+
+    shaded = (n_iter is not None) and (n_shades > 1)
+    if shaded and n_steps is None:
+        n_steps = max(int(n_iter.max()), 1)
+
+    for r in range(0, basin.shape[0], chunk):
+        rows = slice(r, r + chunk)
+        idx = _lut_index(basin[rows], n_shades,
+                         n_iter[rows] if shaded else None, n_steps)
+        np.take(lut_f, idx, axis=0, out=out[rows])
+
+    return out
+
+def _lut_index(basin, n_shades, n_iter=None, n_steps=None):
+    """
+    Row of every pixel in the flattened lookup table.
+    """
+    idx = basin.astype(np.intp) * n_shades
+    if n_iter is not None:
+        level = np.minimum(n_iter, n_steps).astype(np.intp)
+        idx += level * (n_shades - 1) // n_steps
+    return idx
+
+def NR_save_image(fname, rgba):
+    """
+    Save an RGBA image as `.npy` or as PNG (or any other format of
+    `matplotlib.image.imsave`) without creating a figure.
+    """
+    if fname.endswith('.npy'):
+        np.save(fname, rgba)
+    else:
+        mpimg.imsave(fname, rgba)
+
+
+
+#######
+#
+#    ANTIALIASING
+#
+##########################################################################
+
+def srgb_to_linear(c):
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055)**2.4)
+
+def linear_to_srgb(c):
+    return np.where(c <= 0.0031308, c * 12.92,
+                    1.055 * np.power(c, 1/2.4) - 0.055)
+
+def boundary_pixels(basin):
+    """
+    Number of 4-neighbours of every pixel that lie in a different basin.
+    """
+    diff = np.zeros(basin.shape, dtype=np.uint8)
+    for axis in (0, 1):
+        a = (slice(None),)*axis + (slice(1, None),)
+        b = (slice(None),)*axis + (slice(None, -1),)
+        d = basin[a] != basin[b]
+        diff[a] += d
+        diff[b] += d
+    return diff
+
+def NR_antialias(P, rgba, basin, n_iter, lut, n_steps,
+                 grid_lim_x, grid_lim_y, tol=1e-8, ss=4, budget=1.0,
+                 chunk=2**14, backend=None, dtype=np.complex128,
+                 scheme=None):
+    """
+    Antialias the basin boundaries of a rendered image in place.
+
+    Only the pixels with a neighbour in a different basin are
+    supersampled on a regular `ss x ss` subpixel grid. The colors of the
+    subpixels are averaged in linear RGB, so the edges do not get darker
+    than the basins on their sides.
+
+    Parameters:
+    -----------
+    rgba : numpy.ndarray
+      Image rendered from `basin` and `n_iter` with `NR_rgba`.
+    basin, n_iter : numpy.ndarray
+      Basin indices and step counts of the pixels.
+    lut : numpy.ndarray
+      Lookup table the image was colored with.
+    n_steps : int
+      Maximum number of steps, also mapped to the darkest shade.
+    ss : int
+      Number of subpixels along each side of a pixel.
+    budget : float
+      Upper limit of the extra samples, relative to the number of
+      pixels in the image. If there are more boundary pixels than it
+      allows, those with the most differing neighbours are refined.
+    chunk : int
+      Number of pixels supersampled at once.
+
+    Returns:
+    --------
+    n_refined : int
+      Number of supersampled pixels.
+    """
+    ny, nx = basin.shape
+    x, y = get_grid_axes((ny, nx), grid_lim_x, grid_lim_y, dtype=dtype)
+    dx = (x[-1] - x[0]) / max(nx - 1, 1)
+    dy = (y[-1] - y[0]) / max(ny - 1, 1)
+
+    # Boundary pixels in the order of refinement
+    diff = boundary_pixels(basin).reshape(-1)
+    idx = np.flatnonzero(diff)
+    n_max = int(budget * ny * nx) // (ss * ss)
+    if idx.size > n_max:
+        idx = idx[np.argsort(-diff[idx], kind='stable')[:n_max]]
+
+    # Subpixel offsets from the pixel centers
+    off = (np.arange(ss) + 0.5) / ss - 0.5
+    off = (off[None, :]*dx + off[:, None]*dy*1j).reshape(-1)
+
+    n_shades = lut.shape[1]
+    lut_lin = srgb_to_linear(lut.reshape(-1, 4) / 255)
+    rgba_f = rgba.reshape(-1, 4)
+    for i in range(0, idx.size, chunk):
+        px = idx[i:i+chunk]
+        r, c = np.divmod(px, nx)
+        Z = (x[c] + y[r]*1j)[:, None] + off.astype(dtype)
+        b, n = NR_render_tile(P, Z, n_steps, tol=tol, backend=backend,
+                              scheme=scheme)
+        shade = n if n_shades > 1 else None
+        color = lut_lin[_lut_index(b, n_shades, shade, n_steps)]
+        color = color.mean(axis=1)
+        rgba_f[px] = (linear_to_srgb(color) * 255 + 0.5).astype(np.uint8)
+
+    return idx.size
+
+
+
+#######
+#
+#    IMAGE RENDERING
+#
+##########################################################################
+
+def NR_fractal_image(P, N=512, n_steps=30,
+                     grid_lim_x=None, grid_lim_y=None,
+                     tol=1e-8, n_shades=32, fname=None,
+                     dtype=np.complex128, antialias=0, aa_budget=1.0):
+    """
+    Render a Newton-Raphson fractal into a uint8 RGBA image and
+    optionally save it, without going through matplotlib figures.
+
+    Parameters:
+    -----------
+    N : int or tuple
+      Side length of the image or its `(rows, cols)` shape.
+    n_shades : int
+      Number of shade levels of the step counts. Use 1 for flat colors.
+    fname : str or None
+      If given, the image is saved there (see `NR_save_image`).
+    antialias : int
+      Number of subpixels along each side of the boundary pixels, eg. 4.
+      If 0, the image is not antialiased (see `NR_antialias`).
+    aa_budget : float
+      Cap of the extra samples of the antialiasing, relative to the
+      number of pixels.
+
+    See `NR_render_tiled` for the rest of the parameters.
+    """
+    basin, n_iter = NR_render_cached(P, N, n_steps,
+                                     grid_lim_x=grid_lim_x,
+                                     grid_lim_y=grid_lim_y,
+                                     tol=tol, dtype=dtype)
+    lut = get_lut(len(P.roots()), n_shades)
+    rgba = NR_rgba(basin, lut, n_iter=n_iter, n_steps=n_steps)
+    if antialias:
+        if grid_lim_x is None: grid_lim_x = NR_missing_grid_lim(P)
+        if grid_lim_y is None: grid_lim_y = NR_missing_grid_lim(P)
+        NR_antialias(P, rgba, basin, n_iter, lut, n_steps,
+                     grid_lim_x, grid_lim_y, tol=tol, ss=antialias,
+                     budget=aa_budget, dtype=dtype)
+
+    if fname is not None:
+        NR_save_image(fname, rgba)
+    return rgba
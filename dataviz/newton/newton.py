@@ -1,5 +1,7 @@
 import numpy as np
 import seaborn as sns
+from functools import partial
+from itertools import product
 
 #######
 #
@@ -9,12 +11,329 @@ import seaborn as sns
 
 def NR_step(P, x):
     return x - P.f(x)/P.fprime(x)
-def NR_iter(P, x, N):
+def NR_iter(P, x, N, delta=None):
+    if delta is None: delta = NR_delta
     Y = x.copy()
-    for i in range(N):
-        Y = NR_step(P, Y)
+    buf = get_work_buffers(Y, n=scheme_buffers(delta, P))
+    # Points hitting `P'(x) = 0` or overflowing simply become non-finite
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for i in range(N):
+            np.subtract(Y, delta(P, Y, buf), out=Y)
     return Y
 
+def NR_iter_snapshots(P, x, steps, delta=None, basins=False):
+    """
+    Iterate the Newton-Raphson method once and yield the state of the
+    points at every requested step count.
+
+    Parameters:
+    -----------
+    P : Polynomial
+      The polynomial to find the roots of.
+    x : array-like
+      Starting points of the iteration.
+    steps : list of int
+      Step counts to take snapshots at, in any order.
+    delta : callable, optional
+      Step function (see `get_scheme`). Defaults to `NR_delta`.
+    basins : bool
+      If `True`, the basin indices of the points (see `closest_roots`)
+      are yielded instead of their positions.
+
+    Yields:
+    -------
+    n : int
+      Number of steps taken, in increasing order.
+    Y : numpy.ndarray
+      Positions or basin indices of the points after `n` steps. The
+      positions are the working array of the iteration, which is
+      overwritten by the following steps, so copy them to keep them.
+    """
+    if delta is None: delta = NR_delta
+    Y = np.array(x, copy=True)
+    buf = get_work_buffers(Y, n=scheme_buffers(delta, P))
+
+    i = 0
+    for n in sorted(set(steps)):
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            for i in range(i, n):
+                np.subtract(Y, delta(P, Y, buf), out=Y)
+        i = n
+        yield n, (closest_roots(Y, P.roots()) if basins else Y)
+
+def NR_snapshots(P, x, steps, callback=None, delta=None, basins=False):
+    """
+    Snapshots of a single Newton-Raphson run at the step counts `steps`
+    (see `NR_iter_snapshots`).
+
+    Parameters:
+    -----------
+    callback : callable, optional
+      Called as `callback(n, Y)` with every snapshot. Without it, all
+      snapshots are copied and returned, which can need a lot of memory
+      for large grids.
+
+    Returns:
+    --------
+    snapshots : dict or None
+      The snapshots keyed by their step counts, if no callback is given.
+    """
+    snapshots = None if callback is not None else {}
+    for n, Y in NR_iter_snapshots(P, x, steps, delta=delta, basins=basins):
+        if callback is not None:
+            callback(n, Y)
+        else:
+            snapshots[n] = Y.copy() if not basins else Y
+    return snapshots
+
+def get_work_buffers(x, n=2):
+    """
+    Allocate the `n` work arrays used by `NR_delta` and `NR_step_inplace`
+    (or the other step functions in `SCHEMES`) for points with the shape
+    of `x`.
+    """
+    dtype = x.dtype if np.issubdtype(x.dtype, np.inexact) else np.float64
+    return tuple(np.empty(x.shape, dtype=dtype) for _ in range(n))
+
+def NR_guard_delta(P, x, dx, delta=None):
+    """
+    Recompute the non-finite steps of single precision points in double
+    precision. These are points where `P(x)` overflowed or `P'(x)`
+    underflowed, but the step itself is still representable.
+    """
+    if np.finfo(dx.dtype).bits >= 64:
+        return dx
+    bad = ~np.isfinite(dx)
+    if np.any(bad):
+        x_bad = x[bad].astype(np.result_type(x.dtype, np.float64))
+        if delta is None:
+            p, dp = P.f_and_fprime(x_bad)
+            dx[bad] = p/dp
+        else:
+            dx[bad] = delta(P, x_bad)
+    return dx
+
+def NR_delta(P, x, buf=None):
+    """
+    Newton-Raphson step `P(x)/P'(x)`, computed into the first array of
+    `buf` without allocating any temporaries. High degree polynomials
+    use the overflow-free `Polynomial.newton_ratio` instead.
+    """
+    if getattr(P, 'scaled', False):
+        return NR_guard_delta(P, x, P.newton_ratio(x, out=buf))
+    p, dp = P.f_and_fprime(x, out=buf)
+    return NR_guard_delta(P, x, np.divide(p, dp, out=p))
+
+def NR_step_inplace(P, x, buf=None):
+    """
+    Take a Newton-Raphson step on the points `x` in place.
+
+    Parameters:
+    -----------
+    P : Polynomial
+      The polynomial to find the roots of.
+    x : numpy.ndarray
+      Points to update.
+    buf : tuple of 2 numpy.ndarray, optional
+      Work arrays from `get_work_buffers`. If given, the step does not
+      allocate any new arrays.
+    """
+    dx = NR_delta(P, x, buf)
+    return np.subtract(x, dx, out=x)
+
+def halley_delta(P, x, buf=None):
+    """
+    Step of Halley's method, which converges cubically to simple roots.
+    Computed as `u / (1 - u*P''/(2P'))` with `u = P/P'`, in the first
+    array of `buf` (3 arrays).
+    """
+    p, dp, ddp = P.f_derivs(x, n=2, out=buf)
+    np.divide(p, dp, out=p)
+    np.divide(ddp, dp, out=ddp)
+    np.multiply(ddp, p, out=ddp)
+    np.multiply(ddp, -0.5, out=ddp)
+    np.add(ddp, 1, out=ddp)
+    return NR_guard_delta(P, x, np.divide(p, ddp, out=p), halley_delta)
+
+def householder_delta(P, x, buf=None):
+    """
+    Step of the third order Householder method (quartic convergence),
+    `u (1 - u*a_2/2) / (1 - u*a_2 + u^2*a_3/6)` with `u = P/P'` and
+    `a_k = P^(k)/P'`. Computed in the first array of `buf` (4 arrays).
+    """
+    p, dp, ddp, dddp = P.f_derivs(x, n=3, out=buf)
+    np.divide(p, dp, out=p)
+    # u*a_2 and u^2*a_3
+    np.divide(ddp, dp, out=ddp)
+    np.multiply(ddp, p, out=ddp)
+    np.divide(dddp, dp, out=dddp)
+    np.multiply(dddp, p, out=dddp)
+    np.multiply(dddp, p, out=dddp)
+    # Denominator in `dddp`, numerator in `dp`
+    np.multiply(dddp, 1/6, out=dddp)
+    np.subtract(dddp, ddp, out=dddp)
+    np.add(dddp, 1, out=dddp)
+    np.multiply(ddp, -0.5, out=dp)
+    np.add(dp, 1, out=dp)
+    np.multiply(dp, p, out=dp)
+    np.divide(dp, dddp, out=p)
+    return NR_guard_delta(P, x, p, householder_delta)
+
+def relaxed_delta(P, x, buf=None, a=0.5):
+    """
+    Step of the relaxed (damped) Newton-Raphson method, `a * P/P'`.
+    Values `a < 1` damp the step, while setting `a` to the multiplicity
+    of a multiple root restores quadratic convergence to it.
+    """
+    dx = NR_delta(P, x, buf)
+    return np.multiply(dx, a, out=dx)
+
+# Iteration schemes and the number of work arrays they need
+SCHEMES = {
+    'newton'      : (NR_delta, 2),
+    'halley'      : (halley_delta, 3),
+    'householder' : (householder_delta, 4),
+    'relaxed'     : (relaxed_delta, 2),
+}
+
+def get_scheme(scheme=None, **kwargs):
+    """
+    Get the step function of an iteration scheme.
+
+    Parameters:
+    -----------
+    scheme : str or callable, optional
+      Name of a scheme in `SCHEMES` (default is 'newton'), or a step
+      function with the signature of `NR_delta`, which is returned as is.
+    kwargs :
+      Parameters of the scheme, eg. the factor `a` of 'relaxed'.
+    """
+    if scheme is None: scheme = 'newton'
+    if callable(scheme):
+        return scheme
+    assert scheme in SCHEMES, \
+           f"Unknown scheme '{scheme}', choose from {tuple(SCHEMES)}!"
+    delta = SCHEMES[scheme][0]
+    return partial(delta, **kwargs) if kwargs else delta
+
+def scheme_buffers(delta, P=None):
+    """
+    Number of work arrays needed by a step function, including the ones
+    `P` needs for its evaluation (see `Polynomial.n_work`).
+    """
+    n_work = getattr(P, 'n_work', 0)
+    if delta is None: return 2 + n_work
+    func = delta.func if isinstance(delta, partial) else delta
+    for f, n in SCHEMES.values():
+        if f is func:
+            return n + n_work
+    return 2 + n_work
+
+def iter_dtype(N):
+    """
+    Smallest unsigned integer type that can hold step counts up to `N`
+    and the `N + 1` of the points that did not converge.
+    """
+    return np.uint16 if N + 1 < 2**16 else np.uint32
+
+def NR_iter_active(P, x, N, tol=1e-8, delta=None):
+    """
+    Iterate the Newton-Raphson method on a set of points, but only keep
+    stepping those points that have not converged yet.
+
+    A point is considered converged when its last step was shorter than
+    `tol`. Points where the step is not finite (eg. `P'(x) = 0`) are
+    frozen at their last finite position and are never marked as
+    converged.
+
+    Parameters:
+    -----------
+    P : Polynomial
+      The polynomial to find the roots of.
+    x : array-like
+      Starting points of the iteration.
+    N : int
+      Maximum number of steps taken for any point.
+    tol : float
+      Step-length threshold for convergence. It is raised to at least
+      `100 * eps` of the precision of `x`, so that single precision
+      points can still converge.
+    delta : callable, optional
+      Function computing the steps with the signature of `NR_delta`.
+      Defaults to `NR_delta`.
+
+    Returns:
+    --------
+    Y : numpy.ndarray
+      Final positions of the points (same shape as `x`).
+    n_iter : numpy.ndarray
+      Number of steps needed to converge for every point. Points that
+      did not converge in `N` steps have `n_iter == N + 1`, so they can
+      be told apart from the ones converging in the last step.
+    """
+    if delta is None: delta = NR_delta
+    Y = np.array(x, copy=True)
+    n_iter = np.full(Y.shape, N + 1, dtype=iter_dtype(N))
+
+    Y_f, n_f = Y.reshape(-1), n_iter.reshape(-1)
+    active = np.arange(Y_f.size)
+
+    # The still active points are kept compacted at the beginning of the
+    # work arrays, so every step only operates on prefixes of them
+    Z = Y_f.copy()
+    buf = get_work_buffers(Z, n=scheme_buffers(delta, P))
+    tol = max(tol, 100 * np.finfo(Z.dtype).eps)
+    dz_abs = np.empty(Z.shape, dtype=np.finfo(Z.dtype).dtype)
+    finite = np.empty(Z.shape, dtype=bool)
+    done = np.empty(Z.shape, dtype=bool)
+
+    n = Z.size
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for i in range(N):
+            z = Z[:n]
+            dz = delta(P, z, tuple(b[:n] for b in buf))
+
+            f_, d_ = finite[:n], done[:n]
+            np.isfinite(dz, out=f_)
+            np.subtract(z, dz, out=z, where=f_)
+
+            np.less(np.abs(dz, out=dz_abs[:n]), tol, out=d_)
+            if not d_.any() and f_.all():
+                continue
+            n_f[active[d_]] = i + 1
+            np.logical_or(d_, np.logical_not(f_, out=f_), out=d_)
+
+            # Write back finished points and drop them from the active set
+            Y_f[active[d_]] = z[d_]
+            keep = ~d_
+            active = active[keep]
+            n = active.size
+            Z[:n] = z[keep]
+            if n == 0:
+                break
+    Y_f[active] = Z[:n]
+
+    return Y, n_iter
+
+def NR_iter_converge(P, x, N, tol=1e-8):
+    """
+    Iterate the Newton-Raphson method until every point converged or
+    `N` steps were taken, then classify the points by their closest root.
+
+    Returns:
+    --------
+    Y : numpy.ndarray
+      Final positions of the points.
+    n_iter : numpy.ndarray
+      Number of steps taken by each point (`N + 1` for non-converged
+      ones, see `NR_iter_active`).
+    basin : numpy.ndarray
+      Index of the root in `P.roots()` closest to each final position.
+    """
+    Y, n_iter = NR_iter_active(P, x, N, tol=tol)
+    basin = closest_roots(Y.reshape(-1), P.roots()).reshape(Y.shape)
+    return Y, n_iter, basin
+
 
 
 #######
@@ -56,8 +375,10 @@ def get_tangent_line(P, x):
 #
 ##########################################################################
 
-def get_starting_grid(N, grid_lim_x, grid_lim_y):
-    X = np.meshgrid(np.linspace(*grid_lim_x, N), np.linspace(*grid_lim_y, N))
+def get_starting_grid(N, grid_lim_x, grid_lim_y, dtype=np.complex128):
+    real = np.finfo(dtype).dtype
+    X = np.meshgrid(np.linspace(*grid_lim_x, N, dtype=real),
+                    np.linspace(*grid_lim_y, N, dtype=real))
     X = X[0].flatten() + X[1].flatten()*1j
     return X
 
@@ -69,13 +390,56 @@ def get_starting_grid(N, grid_lim_x, grid_lim_y):
 #
 ##########################################################################
 
-def closest_roots(X, roots):
-
-    a = np.array([roots - x for x in X])
-    closest = np.array(
-        [np.argmin(np.abs(i)) for i in a]
-    )
-    return closest
+# Upper limit for the size of the temporary distance array in bytes
+CHUNK_MEM = 64 * 2**20
+
+def basin_dtype(n_roots):
+    """
+    Smallest unsigned integer type that can hold a basin index (and
+    one extra value) for `n_roots` roots.
+    """
+    for dtype in (np.uint8, np.uint16):
+        if n_roots < np.iinfo(dtype).max:
+            return dtype
+    return np.uint32
+
+def closest_roots(X, roots, max_mem=CHUNK_MEM):
+    """
+    Find the index of the closest root to every point in `X`.
+
+    The points are processed in blocks so that the `(block, len(roots))`
+    temporary distance array never exceeds `max_mem` bytes.
+
+    Parameters:
+    -----------
+    X : array-like
+      Complex points to classify. Can be of any shape.
+    roots : 1D array-like
+      Roots of the polynomial.
+    max_mem : int
+      Memory ceiling of the temporaries in bytes.
+
+    Returns:
+    --------
+    closest : numpy.ndarray
+      Basin indices with the same shape as `X`, stored in the smallest
+      unsigned integer type that fits (see `basin_dtype`).
+    """
+    X = np.asarray(X)
+    # Compare in the precision of the points to avoid upcast temporaries
+    roots = np.asarray(roots).astype(np.result_type(X.dtype, np.complex64))
+    roots = roots.reshape(1, -1)
+
+    X_f = X.reshape(-1)
+    closest = np.empty(X_f.size, dtype=basin_dtype(roots.size))
+
+    # Every point needs a complex difference and a real distance per root
+    chunk = max(1, int(max_mem // (roots.size * (X.itemsize * 3 // 2))))
+    for i in range(0, X_f.size, chunk):
+        d = np.abs(X_f[i:i+chunk, None] - roots)
+        closest[i:i+chunk] = np.argmin(d, axis=1)
+
+    return closest.reshape(X.shape)
 
 def get_cmap():
     return sns.color_palette("ch:s=-.2,r=.6", as_cmap=True)
@@ -89,9 +453,13 @@ def get_NR_colors(P, X):
     # Find closest root to each grid points
     closest = closest_roots(X, roots)
 
-    # Get colors according to closest root
+    return get_basin_colors(P, closest)
+
+def get_basin_colors(P, basin):
+
+    # Get colors according to the index of the root
     cmap = get_cmap()
-    colors = cmap(closest_roots(X, roots)/(len(P.coeff_())-1))
+    colors = cmap(basin/(len(P.coeff_())-1))
 
     return colors
 
@@ -105,8 +473,7 @@ def get_NR_colors(P, X):
 
 def NR_missing_grid_lim(P):
 
-    roots = P.roots()
-    lim = np.max((np.abs(roots.real), np.abs(roots.imag))) * 1.15
+    lim = np.max(np.abs(P.bbox())) * 1.15
 
     return tuple((-lim, lim))
 
@@ -1,6 +1,197 @@
 import numpy as np
 
+# Polynomials from this degree on are treated as high degree (see
+# `Polynomial.scaled`)
+HIGH_DEGREE = 100
+
+def _frozen(a):
+    a.setflags(write=False)
+    return a
+
+def horner(c, x, n=1, out=None):
+    """
+    Evaluate a polynomial and its first `n` derivatives in a single
+    Horner pass.
+
+    Parameters:
+    -----------
+    c : 1D numpy.ndarray
+      Coefficients of the polynomial.
+    x : array-like
+      Points to evaluate the polynomial at.
+    n : int
+      Number of derivatives to compute.
+    out : tuple of numpy.ndarray, optional
+      Preallocated arrays for `P(x)`, `P'(x)`, ... with the shape of
+      `x`. If given, no new arrays are allocated during the evaluation.
+
+    Returns:
+    --------
+    p, dp, ... : numpy.ndarray
+      Values of `P(x)` and its first `n` derivatives.
+    """
+    if out is None:
+        dtype = np.result_type(x, c)
+        out = tuple(np.empty(np.shape(x), dtype=dtype)
+                    for _ in range(n + 1))
+    d = out[:n+1]
+
+    d[0][...] = c[0]
+    for d_ in d[1:]:
+        d_[...] = 0
+    for c_ in c[1:]:
+        # Higher derivatives have to be updated first using the
+        # previous values of the lower ones
+        for k in range(n, 0, -1):
+            np.multiply(d[k], x, out=d[k])
+            np.add(d[k], d[k-1], out=d[k])
+        np.multiply(d[0], x, out=d[0])
+        np.add(d[0], c_, out=d[0])
+
+    # The scheme above gives `P^(k)(x) / k!`
+    fact = 1
+    for k in range(2, n + 1):
+        fact *= k
+        np.multiply(d[k], fact, out=d[k])
+
+    return d
+
+# Number of extra work arrays needed by `sparse_horner`
+SPARSE_WORK = 3
+
+def ipow(x, e, out=None, base=None):
+    """
+    Integer power `x**e` by repeated squaring, ie. with about `2 log2(e)`
+    multiplications, and exact for complex inputs unlike the `exp(e log
+    x)` path that `numpy.power` takes for large exponents. `base` is an
+    optional work array for the squares.
+    """
+    if out is None:
+        out = np.empty(np.shape(x), dtype=np.result_type(x))
+    out[...] = 1
+    if e == 0:
+        return out
+    if base is None:
+        base = np.array(x, copy=True)
+    else:
+        base[...] = x
+    while True:
+        if e & 1:
+            np.multiply(out, base, out=out)
+        e >>= 1
+        if e == 0:
+            return out
+        np.multiply(base, base, out=base)
+
+def sparse_horner(exps, c, x, n=1, out=None):
+    """
+    Evaluate a sparse polynomial `sum(c * x**exps)` and its first `n`
+    derivatives. The powers of `x` are built up from the increasing
+    exponents one after the other with `ipow`, so every term only costs
+    about `2 log2` of the gap to the previous exponent.
+
+    Parameters:
+    -----------
+    exps : 1D numpy.ndarray
+      Exponents of the nonzero terms in increasing order.
+    c : 1D numpy.ndarray
+      Coefficients of the terms.
+    out : tuple of numpy.ndarray, optional
+      Preallocated arrays for `P(x)`, `P'(x)`, ..., optionally followed
+      by `SPARSE_WORK` work arrays. If all of them are given, no new
+      arrays are allocated during the evaluation.
+
+    See `horner` for the rest of the parameters and the returns.
+    """
+    dtype = np.result_type(x, c)
+    if out is None:
+        out = ()
+    out = tuple(out) + tuple(np.empty(np.shape(x), dtype=dtype)
+                             for _ in range(len(out), n + 1 + SPARSE_WORK))
+    d = out[:n+1]
+    # The squares of `ipow` are only needed before `q` is set
+    pw, q, step = out[n+1:n+1+SPARSE_WORK]
+    for d_ in d:
+        d_[...] = 0
+
+    # `pw` holds `x**max(e - n, 0)` of the current term
+    pw[...] = 1
+    e_pw = 0
+    for e, c_ in zip(exps.tolist(), c):
+        if e - n > e_pw:
+            np.multiply(pw, ipow(x, e - n - e_pw, out=step, base=q),
+                        out=pw)
+            e_pw = e - n
+        # Terms P^(k) = c e (e-1) ... (e-k+1) x**(e-k) from the highest k
+        q[...] = pw
+        for k in range(min(e, n), -1, -1):
+            ff = np.prod(np.arange(e - k + 1, e + 1), dtype=float)
+            np.add(d[k], np.multiply(q, c_ * ff, out=step), out=d[k])
+            if k > 0:
+                np.multiply(q, x, out=q)
+
+    return d
+
+def aberth_roots(c, tol=None, max_iter=500):
+    """
+    Find all roots of a polynomial simultaneously with the Aberth-Ehrlich
+    method. Every iteration costs `O(n^2)` instead of the `O(n^3)` of
+    the companion matrix eigenvalues in `numpy.roots`, and the Newton
+    corrections are computed with the overflow-free ratio of
+    `Polynomial.newton_ratio`, so degrees in the thousands are feasible.
+
+    Parameters:
+    -----------
+    c : 1D array-like
+      Coefficients of the polynomial.
+    tol : float, optional
+      Relative size of the last correction of a converged root. Defaults
+      to a few machine epsilons.
+    max_iter : int
+      Maximum number of iterations.
+
+    Returns:
+    --------
+    roots : numpy.ndarray
+      The roots of the polynomial.
+    """
+    c = np.trim_zeros(np.asarray(c, dtype=np.complex128), trim='f')
+    # Trailing zero coefficients are roots at 0
+    c_nz = np.trim_zeros(c, trim='b')
+    zeros = np.zeros(c.size - c_nz.size, dtype=np.complex128)
+    n = c_nz.size - 1
+    if n < 1:
+        return zeros
+    if tol is None: tol = 4 * np.finfo(np.float64).eps
+
+    # Start on a circle with the geometric mean of the root moduli as
+    # radius, rotated to avoid symmetric configurations
+    P = Polynomial(c_nz)
+    r = np.abs(c_nz[-1] / c_nz[0])**(1/n)
+    z = r * np.exp(1j * (2*np.pi*np.arange(n)/n + 0.4))
+
+    active = np.arange(n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _ in range(max_iter):
+            z_a = z[active]
+            w = P.newton_ratio(z_a)
+            d = z_a[:,None] - z[None,:]
+            d[np.arange(active.size), active] = np.inf
+            corr = w / (1 - w * np.sum(1/d, axis=1))
+            ok = np.isfinite(corr)
+            z[active[ok]] -= corr[ok]
+            done = ok & (np.abs(corr) <= tol * np.abs(z[active]))
+            active = active[~done]
+            if active.size == 0:
+                break
+
+    return np.concatenate((z, zeros))
+
 class Polynomial():
+    """
+    An immutable polynomial. The roots and other derived quantities are
+    only computed once, when they are first needed.
+    """
 
     def __init__(self, c):
         """
@@ -9,16 +200,62 @@ class Polynomial():
         c : 1D array-like
           Coefficients of the polynomial.
         """
-        assert np.all(c != 0), "Can't all coefficients be 0!"
+        c = np.array(c)
+        assert np.any(c != 0), "Can't all coefficients be 0!"
+
+        object.__setattr__(self, 'c', _frozen(np.trim_zeros(c, trim='f')))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Polynomial objects are immutable!")
+
+    def __delattr__(self, name):
+        raise AttributeError("Polynomial objects are immutable!")
+
+    def __reduce__(self):
+        # Cached values are not sent to other processes
+        return (self.__class__, (self.c,))
+
+    def __eq__(self, other):
+        if not isinstance(other, Polynomial):
+            return NotImplemented
+        return np.array_equal(self.c, other.c)
 
-        self.c = np.trim_zeros(np.array(c), trim='f')
-        self.cprime = self.c[:-1] * (np.arange(self.c.size, 1, -1) - 1)
+    def __hash__(self):
+        return hash(tuple(self.c.tolist()))
+
+    def _cached(self, name, func):
+        # Cached values are stored in the instance dictionary directly,
+        # bypassing `__setattr__`
+        if name not in self.__dict__:
+            self.__dict__[name] = func()
+        return self.__dict__[name]
+
+    @property
+    def cprime(self):
+        return self._cached('_cprime', lambda : _frozen(
+            self.c[:-1] * (np.arange(self.c.size, 1, -1) - 1)
+        ))
 
     def coeff_(self):
         return self.c
 
+    def coeff_like(self, x):
+        """
+        Coefficients of the polynomial in the floating point precision
+        of `x`, so that evaluating it does not upcast single precision
+        inputs.
+        """
+        dtype = np.result_type(x)
+        if not np.issubdtype(dtype, np.inexact):
+            dtype = np.dtype(float)
+        dtype = np.finfo(dtype).dtype
+        if np.iscomplexobj(self.c):
+            dtype = np.result_type(dtype, np.complex64)
+        return self._cached(f'_c_{dtype.str}',
+                            lambda : _frozen(self.c.astype(dtype)))
+
     def pcoeff_(self):
-        return selc.cprime
+        return self.cprime
 
     def calc_poly(self, x, c):
         return np.polyval(c, x)
@@ -29,6 +266,134 @@ class Polynomial():
     def fprime(self, x):
         return self.calc_poly(x, self.cprime)
 
+    def f_and_fprime(self, x, out=None):
+        """
+        Evaluate the polynomial and its derivative in a single Horner pass.
+        See `f_derivs`.
+        """
+        return self.f_derivs(x, n=1, out=out)
+
+    def f_derivs(self, x, n=2, out=None):
+        """
+        Evaluate the polynomial and its first `n` derivatives in a single
+        Horner pass.
+
+        Parameters:
+        -----------
+        x : array-like
+          Points to evaluate the polynomial at.
+        n : int
+          Number of derivatives to compute.
+        out : tuple of numpy.ndarray, optional
+          Preallocated arrays for `P(x)`, `P'(x)`, ... with the shape of
+          `x`, followed by `n_work` work arrays. If given, no new arrays
+          are allocated during the evaluation.
+
+        Returns:
+        --------
+        p, dp, ... : numpy.ndarray
+          Values of `P(x)` and its first `n` derivatives.
+        """
+        if self.sparse:
+            exps, c = self.terms_like(x)
+            return sparse_horner(exps, c, x, n=n, out=out)
+        return horner(self.coeff_like(x), x, n=n, out=out)
+
+    def newton_ratio(self, x, out=None):
+        """
+        Overflow-free Newton-Raphson step `P(x)/P'(x)`.
+
+        For `|x| > 1` the reversed polynomial `R(y) = y^n P(1/y)` is
+        evaluated at `y = 1/x` instead, using
+
+            P(x)/P'(x) = x R(y) / (n R(y) - y R'(y)),
+
+        so no power of `x` above 1 in absolute value is ever formed.
+        This is what makes the iteration of high degree polynomials
+        possible (see `scaled`).
+
+        Parameters:
+        -----------
+        x : array-like
+          Points to evaluate the ratio at.
+        out : tuple of numpy.ndarray, optional
+          Work arrays with the shape of `x`. The result is stored in the
+          first one.
+        """
+        x = np.asarray(x)
+        c = self.coeff_like(x)
+        if out is None:
+            out = (np.empty(x.shape, dtype=np.result_type(x, c)),)
+        r = out[0]
+
+        big = np.abs(x) > 1
+        for mask, rev in ((~big, False), (big, True)):
+            if not mask.any():
+                continue
+            x_ = x[mask]
+            if rev:
+                y = 1 / x_
+                if self.sparse:
+                    exps, c_ = self.terms_like(x)
+                    q, dq = sparse_horner(self.degree - exps[::-1],
+                                          c_[::-1], y)
+                else:
+                    q, dq = horner(c[::-1], y)
+                r[mask] = x_ * q / ((c.size - 1)*q - y*dq)
+            else:
+                p, dp = self.f_derivs(x_, n=1)
+                r[mask] = p / dp
+        return r
+
+    @property
+    def degree(self):
+        return self.c.size - 1
+
+    def terms_like(self, x):
+        """
+        Exponents (in increasing order) and coefficients of the nonzero
+        terms, in the precision of `x` (see `coeff_like`).
+        """
+        c = self.coeff_like(x)
+        def terms():
+            idx = np.flatnonzero(c)[::-1]
+            return _frozen(self.degree - idx), _frozen(c[idx])
+        return self._cached(f'_terms_{c.dtype.str}', terms)
+
+    @property
+    def sparse(self):
+        """
+        Whether evaluating the nonzero terms one by one with shared
+        powers (`sparse_horner`) is cheaper than the dense Horner scheme,
+        based on the number of array passes needed by each. The constants
+        were calibrated on 512x512 grids, where eg. `z^8 - 1` is still
+        faster to evaluate densely, but `z^12 - 1` is not.
+        """
+        def sparse():
+            exps = self.degree - np.flatnonzero(self.c)[::-1]
+            gaps = np.diff(exps, prepend=0)
+            # Setting up the outputs and work arrays, then the squarings
+            # and multiplications of `ipow` plus the sums of every term
+            cost = 12 + sum(2 * int(g).bit_length() + 6 for g in gaps)
+            return cost < 4 * self.degree
+        return self._cached('_sparse', sparse)
+
+    @property
+    def n_work(self):
+        """
+        Number of work arrays `f_derivs` needs besides its outputs.
+        """
+        return SPARSE_WORK if self.sparse else 0
+
+    @property
+    def scaled(self):
+        """
+        Whether the polynomial is of high degree, so that its roots are
+        found with `aberth_roots` and its Newton-Raphson steps with the
+        overflow-free `newton_ratio`.
+        """
+        return self.degree >= HIGH_DEGREE
+
     def _get_str(self, c):
         s = ''
         fmt = ' {0} {1}x^{{{2}}}'
@@ -51,4 +416,18 @@ class Polynomial():
         return self._get_str(self.cprime)
 
     def roots(self):
-        return np.roots(self.c)
\ No newline at end of file
+        def roots():
+            if self.scaled:
+                return aberth_roots(self.c)
+            return np.roots(self.c)
+        return self._cached('_roots', lambda : _frozen(roots()))
+
+    def bbox(self):
+        """
+        Bounding box of the roots as `((xmin, xmax), (ymin, ymax))`.
+        """
+        def bbox():
+            r = self.roots()
+            return ((r.real.min(), r.real.max()),
+                    (r.imag.min(), r.imag.max()))
+        return self._cached('_bbox', bbox)
@@ -0,0 +1,559 @@
+import os
+import numpy as np
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+from .newton import *
+from .backends import NR_kernel, check_backend
+
+
+#######
+#
+#    GRID TILES
+#
+##########################################################################
+
+def get_shape(N):
+    """
+    Image shape `(rows, cols)` from either a single side length or an
+    explicit `(rows, cols)` tuple.
+    """
+    if np.ndim(N) == 0:
+        return int(N), int(N)
+    ny, nx = N
+    return int(ny), int(nx)
+
+def get_grid_axes(N, grid_lim_x, grid_lim_y, dtype=np.complex128):
+    """
+    Coordinates of the pixel columns and rows of the grid.
+
+    Only the two 1D axes are stored, the complex grid itself is built
+    tile by tile in `get_grid_tile`. The first row corresponds to the
+    top of the image, ie. to the largest imaginary part, just like the
+    grid used by `NR_fractal`. The axes are stored in the real
+    counterpart of the complex `dtype` of the grid.
+    """
+    ny, nx = get_shape(N)
+    real = np.finfo(dtype).dtype
+    x = np.linspace(*grid_lim_x, nx, dtype=real)
+    y = np.linspace(*grid_lim_y[::-1], ny, dtype=real)
+    return x, y
+
+def get_grid_tile(x, y, rows, cols):
+    return x[cols][None, :] + y[rows][:, None]*1j
+
+def get_tiles(N, tile):
+    """
+    Iterate over the `(rows, cols)` slices of the tiles covering an image.
+    """
+    ny, nx = get_shape(N)
+    ty, tx = get_shape(tile)
+    for r in range(0, ny, ty):
+        for c in range(0, nx, tx):
+            yield slice(r, min(r+ty, ny)), slice(c, min(c+tx, nx))
+
+
+
+#######
+#
+#    TILED RENDERING
+#
+##########################################################################
+
+def NR_render_tile(P, Z, n_steps, tol=None, backend=None, scheme=None):
+    """
+    Iterate and classify a single tile of starting points.
+
+    Parameters:
+    -----------
+    P : Polynomial
+      The polynomial to find the roots of.
+    Z : numpy.ndarray
+      Complex starting points.
+    n_steps : int
+      Number of steps, or the maximum number of steps if `tol` is given.
+    tol : float or None
+      Convergence threshold passed to `NR_iter_active`. If `None`, every
+      point is iterated exactly `n_steps` times.
+    backend : str or None
+      Compute backend of the kernel (see `backends.NR_kernel`).
+    scheme : str or callable, optional
+      Iteration scheme (see `newton.get_scheme`).
+
+    Returns:
+    --------
+    basin : numpy.ndarray
+      Index of the closest root for every point.
+    n_iter : numpy.ndarray
+      Number of steps taken by every point. With `tol` given, points
+      that did not converge have `n_steps + 1`.
+    """
+    return NR_kernel(P, Z, n_steps, tol=tol, backend=backend, scheme=scheme)
+
+def NR_iter_tiles(P, N, n_steps=10,
+                  grid_lim_x=None, grid_lim_y=None,
+                  tol=None, tile=1024, backend=None,
+                  dtype=np.complex128, scheme=None):
+    """
+    Lazily render an image tile by tile.
+
+    Yields:
+    -------
+    rows, cols : slice
+      Position of the tile in the full image.
+    basin, n_iter : numpy.ndarray
+      Results of `NR_render_tile` for the tile.
+    """
+    if grid_lim_x is None: grid_lim_x = NR_missing_grid_lim(P)
+    if grid_lim_y is None: grid_lim_y = NR_missing_grid_lim(P)
+
+    x, y = get_grid_axes(N, grid_lim_x, grid_lim_y, dtype=dtype)
+    for rows, cols in get_tiles(N, tile):
+        Z = get_grid_tile(x, y, rows, cols)
+        basin, n_iter = NR_render_tile(P, Z, n_steps, tol=tol,
+                                       backend=backend, scheme=scheme)
+        yield rows, cols, basin, n_iter
+
+def open_output(out, shape, dtype):
+    """
+    Prepare an output array for a render.
+
+    Parameters:
+    -----------
+    out : None, str or numpy.ndarray
+      If `None`, a new in-memory array is allocated. If a path is
+      given, a memory-mapped `.npy` file is created there. Existing
+      arrays (eg. an opened memory map) are used as they are.
+    """
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if isinstance(out, str):
+        return np.lib.format.open_memmap(out, mode='w+',
+                                         dtype=dtype, shape=shape)
+    assert out.shape == shape, \
+           f"Output has shape {out.shape} instead of {shape}!"
+    return out
+
+def get_iter_output(out, out_iter):
+    """
+    Storage of the step counts. If the basins are written to a file and
+    no storage is given, the step counts go to a `.npy` file next to it
+    (`basin.npy` -> `basin_iter.npy`), so that the image is never held
+    in memory as a whole.
+    """
+    if (out_iter is None) and isinstance(out, str):
+        root, ext = os.path.splitext(out)
+        return f'{root}_iter{ext or ".npy"}'
+    return out_iter
+
+def NR_render_tiled(P, N, n_steps=10,
+                    grid_lim_x=None, grid_lim_y=None,
+                    tol=None, tile=1024,
+                    out=None, out_iter=None,
+                    backend=None, dtype=np.complex128, scheme=None):
+    """
+    Render the basins of a Newton-Raphson fractal tile by tile.
+
+    Only a single `tile x tile` block of the grid exists in memory at
+    any time, so with memory-mapped outputs the peak memory usage is
+    set by the tile size and not by the size of the image.
+
+    Parameters:
+    -----------
+    P : Polynomial
+      The polynomial to find the roots of.
+    N : int or tuple
+      Side length of the image or its `(rows, cols)` shape.
+    n_steps : int
+      Number of steps, or the maximum number of steps if `tol` is given.
+    grid_lim_x, grid_lim_y : tuple
+      Limits of the rendered window on the complex plane.
+    tol : float or None
+      Convergence threshold for the iteration.
+    tile : int or tuple
+      Size of the tiles rendered at once.
+    out : None, str or numpy.ndarray
+      Storage for the basin indices (see `open_output`).
+    out_iter : None, False, str or numpy.ndarray
+      Storage for the step counts. If `False`, they are not kept. If
+      `None`, they are written next to `out` when it is a path (see
+      `get_iter_output`), and kept in memory otherwise.
+    backend : str or None
+      Compute backend of the kernel (see `backends.NR_kernel`).
+    dtype : numpy.dtype
+      Precision of the iteration, either `numpy.complex128` or
+      `numpy.complex64`. Single precision halves the memory traffic,
+      which is enough for renders at screen resolution.
+    scheme : str or callable, optional
+      Iteration scheme, eg. 'halley' (see `newton.get_scheme`). Only
+      the `numpy` backend supports other schemes than 'newton'.
+
+    Returns:
+    --------
+    basin : numpy.ndarray
+      Basin index of every pixel, with the first row at the top.
+    n_iter : numpy.ndarray or None
+      Number of steps taken by every pixel.
+    """
+    shape = get_shape(N)
+    basin = open_output(out, shape, basin_dtype(len(P.roots())))
+    n_iter = None
+    if out_iter is not False:
+        n_iter = open_output(get_iter_output(out, out_iter), shape,
+                             iter_dtype(n_steps))
+
+    for rows, cols, b, n in NR_iter_tiles(P, N, n_steps,
+                                          grid_lim_x, grid_lim_y,
+                                          tol=tol, tile=tile,
+                                          backend=backend, dtype=dtype,
+                                          scheme=scheme):
+        basin[rows, cols] = b
+        if n_iter is not None:
+            n_iter[rows, cols] = n
+
+    for arr in (basin, n_iter):
+        if isinstance(arr, np.memmap):
+            arr.flush()
+
+    return basin, n_iter
+
+
+
+#######
+#
+#    PARALLEL RENDERING
+#
+##########################################################################
+
+# Per-process state of the render workers, set up by `_init_worker`
+_worker = {}
+
+def _attach_output(desc):
+    """
+    Open an output buffer described by `_describe_output` in a worker.
+    """
+    kind, ref, shape, dtype = desc
+    if kind == 'file':
+        return np.load(ref, mmap_mode='r+'), None
+    try:
+        # The parent process owns the segment, the workers should not
+        # unregister it from the resource tracker when they exit
+        shm = shared_memory.SharedMemory(name=ref, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=ref)
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf), shm
+
+def _describe_output(out, shape, dtype):
+    """
+    Allocate an output buffer that the workers can write into directly.
+    Returns the array in the parent, the handle of the shared memory
+    segment (if any) and the picklable description of the buffer.
+    """
+    if isinstance(out, str):
+        arr = open_output(out, shape, dtype)
+        arr.flush()
+        return arr, None, ('file', out, shape, dtype)
+    assert out is None, "Parallel renders can only write to new arrays!"
+    nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return arr, shm, ('shm', shm.name, shape, dtype)
+
+def _init_worker(P, n_steps, tol, backend, scheme, descs):
+    _worker['P'] = P
+    _worker['n_steps'] = n_steps
+    _worker['tol'] = tol
+    _worker['backend'] = backend
+    _worker['scheme'] = scheme
+    _worker['outputs'] = [_attach_output(d) for d in descs]
+
+def _render_tile_worker(task):
+    rows, cols, x, y = task
+    Z = x[None, :] + y[:, None]*1j
+    results = NR_render_tile(_worker['P'], Z,
+                             _worker['n_steps'], tol=_worker['tol'],
+                             backend=_worker['backend'],
+                             scheme=_worker['scheme'])
+    for (arr, _), res in zip(_worker['outputs'], results):
+        arr[rows, cols] = res
+    return None
+
+def NR_render_parallel(P, N, n_steps=10,
+                       grid_lim_x=None, grid_lim_y=None,
+                       tol=None, tile=256,
+                       n_workers=None, chunksize=1,
+                       out=None, out_iter=None,
+                       backend=None, dtype=np.complex128, scheme=None):
+    """
+    Render the basins of a Newton-Raphson fractal on multiple cores.
+
+    The image is split into tiles that are dispatched to a process pool.
+    The workers write their results directly into shared memory (or
+    into memory-mapped `.npy` files, if paths are given as outputs), so
+    no large arrays are sent between the processes.
+
+    Parameters:
+    -----------
+    tile : int or tuple
+      Size of the tiles. Use eg. `(16, N)` to render row bands.
+    n_workers : int or None
+      Number of worker processes. Defaults to the number of CPUs.
+    chunksize : int
+      Number of tiles sent to a worker at once.
+    out, out_iter : None or str
+      Paths of memory-mapped `.npy` outputs. If `None`, the results are
+      returned as in-memory arrays, but the step counts are written next
+      to `out` when it is a path (see `get_iter_output`). If `out_iter`
+      is `False`, the step counts are not kept.
+
+    See `NR_render_tiled` for the rest of the parameters and the returns.
+    """
+    if grid_lim_x is None: grid_lim_x = NR_missing_grid_lim(P)
+    if grid_lim_y is None: grid_lim_y = NR_missing_grid_lim(P)
+    if n_workers is None: n_workers = os.cpu_count()
+    # Resolve the default backend here, the workers might not inherit it
+    backend = check_backend(backend)
+
+    shape = get_shape(N)
+    x, y = get_grid_axes(N, grid_lim_x, grid_lim_y, dtype=dtype)
+    tasks = [(rows, cols, x[cols], y[rows])
+             for rows, cols in get_tiles(N, tile)]
+
+    outputs = [_describe_output(out, shape, basin_dtype(len(P.roots())))]
+    if out_iter is not False:
+        outputs.append(_describe_output(get_iter_output(out, out_iter),
+                                        shape, iter_dtype(n_steps)))
+
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 initializer=_init_worker,
+                                 initargs=(P, n_steps, tol, backend, scheme,
+                                           [d for _, _, d in outputs])) as pool:
+            for _ in pool.map(_render_tile_worker, tasks,
+                              chunksize=chunksize):
+                pass
+
+        results = []
+        for arr, shm, _ in outputs:
+            if shm is None:
+                arr.flush()
+                results.append(arr)
+            else:
+                results.append(arr.copy())
+    finally:
+        for _, shm, _ in outputs:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    basin = results[0]
+    n_iter = results[1] if out_iter is not False else None
+    return basin, n_iter
+
+
+
+#######
+#
+#    ADAPTIVE RENDERING
+#
+##########################################################################
+
+def _ranges(lengths):
+    """
+    Segment index and offset within the segment for the concatenation
+    of `arange(l)` for every `l` in `lengths`.
+    """
+    seg = np.repeat(np.arange(lengths.size), lengths)
+    off = np.arange(seg.size) - np.repeat(np.cumsum(lengths) - lengths,
+                                          lengths)
+    return seg, off
+
+def _rect_pixels(rects, nx):
+    """
+    Flat indices of the pixels in an array of `(r0, r1, c0, c1)`
+    rectangles of an image with `nx` columns. The limits are half-open
+    and the pixels of every rectangle are contiguous in the output.
+    """
+    r0, r1, c0, c1 = rects.T
+    seg_r, off_r = _ranges(r1 - r0)
+    rows, c0, w = r0[seg_r] + off_r, c0[seg_r], (c1 - c0)[seg_r]
+    seg_c, off_c = _ranges(w)
+    return rows[seg_c]*nx + c0[seg_c] + off_c
+
+def _block_borders(blocks):
+    """
+    The top, bottom, left and right edges of every block as rectangles,
+    ordered block by block.
+    """
+    r0, r1, c0, c1 = blocks.T
+    edges = np.stack([
+        np.c_[r0, r0+1, c0, c1],   np.c_[r1-1, r1, c0, c1],
+        np.c_[r0+1, r1-1, c0, c0+1], np.c_[r0+1, r1-1, c1-1, c1]
+    ], axis=1)
+    return edges.reshape(-1, 4)
+
+def _split_blocks(blocks):
+    """
+    Split every block into 4 children that share their inner edges.
+    """
+    r0, r1, c0, c1 = blocks.T
+    rm, cm = (r0 + r1) // 2, (c0 + c1) // 2
+    children = np.stack([
+        np.c_[r0, rm+1, c0, cm+1], np.c_[r0, rm+1, cm, c1],
+        np.c_[rm, r1, c0, cm+1],   np.c_[rm, r1, cm, c1]
+    ], axis=1)
+    return children.reshape(-1, 4)
+
+def NR_render_adaptive(P, N, n_steps=30,
+                       grid_lim_x=None, grid_lim_y=None,
+                       tol=1e-8, min_block=8, backend=None,
+                       dtype=np.complex128, scheme=None):
+    """
+    Render the basins of a Newton-Raphson fractal by recursively
+    subdividing the image (Mariani-Silver algorithm).
+
+    Only the edges of a block are iterated first. If every pixel on the
+    edges fell into the same basin (and converged, if `tol` is given),
+    the whole block is filled with that basin without iterating its
+    inside. Otherwise the block is split into 4 and the same is done for
+    the children. The blocks of every level are iterated together in a
+    single call of the kernel.
+
+    Parameters:
+    -----------
+    min_block : int
+      Blocks with a side of at most `min_block` pixels are not filled or
+      split further, but are iterated pixel by pixel. Larger values are
+      safer for basins with thin details, but fill less of the image.
+
+    See `NR_render_tiled` for the rest of the parameters.
+
+    Returns:
+    --------
+    basin : numpy.ndarray
+      Basin index of every pixel.
+    n_iter : numpy.ndarray
+      Number of steps taken by every pixel. For filled pixels, this is
+      the smallest step count found on the edges of their block.
+    """
+    assert min_block >= 3, "Blocks should be at least 3 pixels wide!"
+    if grid_lim_x is None: grid_lim_x = NR_missing_grid_lim(P)
+    if grid_lim_y is None: grid_lim_y = NR_missing_grid_lim(P)
+
+    ny, nx = get_shape(N)
+    x, y = get_grid_axes(N, grid_lim_x, grid_lim_y, dtype=dtype)
+
+    basin = np.zeros((ny, nx), dtype=basin_dtype(len(P.roots())))
+    n_iter = np.zeros((ny, nx), dtype=iter_dtype(n_steps))
+    known = np.zeros((ny, nx), dtype=bool)
+    basin_f, n_iter_f, known_f = (a.reshape(-1) for a in (basin, n_iter, known))
+
+    def compute(idx):
+        idx = idx[~known_f[idx]]
+        if idx.size == 0:
+            return
+        # Neighbouring blocks share their edges
+        idx.sort()
+        idx = idx[np.r_[True, idx[1:] != idx[:-1]]]
+        Z = x[idx % nx] + y[idx // nx]*1j
+        basin_f[idx], n_iter_f[idx] = NR_render_tile(P, Z, n_steps, tol=tol,
+                                                     backend=backend,
+                                                     scheme=scheme)
+        known_f[idx] = True
+
+    blocks = np.array([[0, ny, 0, nx]])
+    while blocks.size > 0:
+        small = np.minimum(blocks[:,1] - blocks[:,0],
+                           blocks[:,3] - blocks[:,2]) <= min_block
+        if np.any(small):
+            compute(_rect_pixels(blocks[small], nx))
+        blocks = blocks[~small]
+        if blocks.size == 0:
+            break
+
+        # Pixels on the edges of every block, stored block by block
+        border = _rect_pixels(_block_borders(blocks), nx)
+        compute(border)
+        r0, r1, c0, c1 = blocks.T
+        start = np.r_[0, np.cumsum(2*(r1 - r0) + 2*(c1 - c0) - 4)[:-1]]
+
+        b, n = basin_f[border], n_iter_f[border]
+        uniform = (np.minimum.reduceat(b, start) == np.maximum.reduceat(b, start))
+        if tol is not None:
+            uniform &= (np.maximum.reduceat(n, start) <= n_steps)
+        n_min = np.minimum.reduceat(n, start)
+
+        for (r0, r1, c0, c1), b_, n_ in zip(blocks[uniform],
+                                            b[start[uniform]], n_min[uniform]):
+            basin[r0+1:r1-1, c0+1:c1-1] = b_
+            n_iter[r0+1:r1-1, c0+1:c1-1] = n_
+            known[r0+1:r1-1, c0+1:c1-1] = True
+
+        blocks = _split_blocks(blocks[~uniform])
+
+    return basin, n_iter
+
+
+
+#######
+#
+#    PROGRESSIVE RENDERING
+#
+##########################################################################
+
+def NR_render_progressive(P, N, n_steps=30,
+                          grid_lim_x=None, grid_lim_y=None,
+                          tol=1e-8, levels=(16, 4, 1),
+                          backend=None, dtype=np.complex128, scheme=None):
+    """
+    Render an image in successively finer levels.
+
+    At a level with stride `s`, every `s`-th pixel of every `s`-th row
+    is iterated, except those already computed on coarser levels. The
+    previews are upsampled to the full resolution by repeating the
+    computed pixels. The work of a level only starts when the next
+    preview is requested, so closing the generator (eg. breaking out of
+    the loop) cancels the rest of the render.
+
+    Parameters:
+    -----------
+    levels : tuple of int
+      Strides of the levels in decreasing order. The last one should be
+      1 to get the full-resolution image.
+
+    See `NR_render_tiled` for the rest of the parameters.
+
+    Yields:
+    -------
+    stride : int
+      Stride of the level.
+    basin, n_iter : numpy.ndarray
+      Full-resolution preview of the basins and step counts.
+    """
+    if grid_lim_x is None: grid_lim_x = NR_missing_grid_lim(P)
+    if grid_lim_y is None: grid_lim_y = NR_missing_grid_lim(P)
+
+    ny, nx = get_shape(N)
+    x, y = get_grid_axes(N, grid_lim_x, grid_lim_y, dtype=dtype)
+
+    basin = np.zeros((ny, nx), dtype=basin_dtype(len(P.roots())))
+    n_iter = np.zeros((ny, nx), dtype=iter_dtype(n_steps))
+    known = np.zeros((ny, nx), dtype=bool)
+
+    for s in levels:
+        rows, cols = np.mgrid[0:ny:s, 0:nx:s]
+        new = ~known[rows, cols]
+        rows, cols = rows[new], cols[new]
+        if rows.size > 0:
+            basin[rows, cols], n_iter[rows, cols] = NR_render_tile(
+                P, x[cols] + y[rows]*1j, n_steps, tol=tol,
+                backend=backend, scheme=scheme
+            )
+            known[rows, cols] = True
+
+        if s == 1:
+            yield s, basin, n_iter
+        else:
+            yield (s, *(np.repeat(np.repeat(a[::s, ::s], s, axis=0),
+                                  s, axis=1)[:ny, :nx]
+                        for a in (basin, n_iter)))
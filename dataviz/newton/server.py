@@ -0,0 +1,300 @@
+import io
+import os
+import re
+import threading
+import numpy as np
+import matplotlib.image as mpimg
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .newton import *
+from .render import NR_render_tiled
+from .image import get_lut, NR_rgba
+from .cache import cache_key, _evict
+
+#######
+#
+#    TILE RENDERING
+#
+##########################################################################
+
+def get_tile_lims(z, x, y, center, width, tile=256):
+    """
+    Limits of the pixel centers of a slippy-map tile.
+
+    At zoom level 0, the single tile `(0, 0)` covers the square window
+    of side `width` around `center`. Each zoom level halves the size of
+    the tiles, `x` grows to the right and `y` grows downwards.
+
+    Returns:
+    --------
+    grid_lim_x, grid_lim_y : tuple
+      Limits for `NR_render_tiled` with `N=tile`.
+    """
+    s = width / 2**z
+    left = center.real - width/2 + x*s
+    top = center.imag + width/2 - y*s
+    # Tiles are sampled at the centers of their pixels, so neighbouring
+    # tiles don't repeat the pixels on their common edge
+    h = s / tile / 2
+    return (left + h, left + s - h), (top - s + h, top - h)
+
+def NR_tile_png(P, z, x, y, center, width,
+                tile=256, n_steps=50, tol=1e-8, n_shades=32):
+    """
+    Render a single map tile into PNG bytes.
+    """
+    grid_lim_x, grid_lim_y = get_tile_lims(z, x, y, center, width, tile)
+    basin, n_iter = NR_render_tiled(P, tile, n_steps,
+                                    grid_lim_x=grid_lim_x,
+                                    grid_lim_y=grid_lim_y, tol=tol)
+    rgba = NR_rgba(basin, get_lut(len(P.roots()), n_shades),
+                   n_iter=n_iter, n_steps=n_steps)
+    buf = io.BytesIO()
+    mpimg.imsave(buf, rgba, format='png')
+    return buf.getvalue()
+
+
+
+#######
+#
+#    TILE CACHE
+#
+##########################################################################
+
+class NR_TileCache():
+    """
+    Renders tiles of a single fractal on a process pool and keeps them
+    in an in-memory LRU cache backed by a directory of PNG files.
+    """
+
+    def __init__(self, P, center=None, width=None,
+                 tile=256, n_steps=50, tol=1e-8, n_shades=32,
+                 n_workers=None, max_tiles=2048,
+                 tiledir='./out/tiles/', max_bytes=256 * 2**20,
+                 prefetch=True, max_prefetch=None):
+        """
+        Parameters:
+        -----------
+        P : Polynomial
+          The polynomial to render.
+        center : complex or None
+          Center of the zoom level 0 tile. Defaults to the origin.
+        width : float or None
+          Side of the zoom level 0 tile. Defaults to the window of
+          `NR_missing_grid_lim`.
+        tile : int
+          Side length of the tiles in pixels.
+        n_workers : int or None
+          Number of worker processes. Defaults to the number of CPUs.
+        max_tiles : int
+          Number of tiles kept in memory.
+        tiledir : str or None
+          Directory of the on-disk cache. If `None`, tiles are only
+          cached in memory.
+        max_bytes : int
+          Size limit of the on-disk cache. The least recently used tiles
+          are deleted above it.
+        prefetch : bool
+          Whether to render the neighbours of requested tiles ahead.
+        max_prefetch : int or None
+          Number of prefetched tiles rendered at the same time, so that
+          they do not hold up the requested ones. Defaults to
+          `n_workers`.
+        """
+        if center is None: center = 0j
+        if n_workers is None: n_workers = os.cpu_count()
+        if max_prefetch is None: max_prefetch = n_workers
+        if width is None: width = np.diff(NR_missing_grid_lim(P))[0]
+
+        self.P = P
+        self.args = dict(center=complex(center), width=float(width),
+                         tile=tile, n_steps=n_steps, tol=tol,
+                         n_shades=n_shades)
+        self.max_tiles = max_tiles
+        self.max_bytes = max_bytes
+        self.prefetch = prefetch
+        self.max_prefetch = max_prefetch
+
+        self.tiledir = None
+        self.disk_bytes = 0
+        if tiledir is not None:
+            key = cache_key('tiles', P, {k : repr(v)
+                                         for k, v in self.args.items()})
+            self.tiledir = os.path.join(tiledir, key[:16])
+            os.makedirs(self.tiledir, exist_ok=True)
+            self.disk_bytes = _evict(self.tiledir, max_bytes, ext='.png')
+
+        self.pool = ProcessPoolExecutor(max_workers=n_workers)
+        # Reentrant, because callbacks of already finished renders run
+        # right away in the thread that registers them
+        self.lock = threading.RLock()
+        self.tiles = OrderedDict()
+        self.pending = {}
+        self.prefetching = set()
+
+    def _path(self, z, x, y):
+        # A flat directory, so that `cache._evict` can manage it
+        return os.path.join(self.tiledir, f'{z}_{x}_{y}.png')
+
+    def _remember(self, key, png):
+        with self.lock:
+            self.tiles[key] = png
+            self.tiles.move_to_end(key)
+            while len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+
+    def _store(self, key, future):
+        try:
+            # Failed renders are reported by the future to the requester
+            # and retried by the next request
+            if future.cancelled() or (future.exception() is not None):
+                return
+            png = future.result()
+            if self.tiledir is not None:
+                self._write(self._path(*key), png)
+            self._remember(key, png)
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+                self.prefetching.discard(key)
+
+    def _write(self, path, png):
+        with open(path + '.tmp', 'wb') as f:
+            f.write(png)
+        os.replace(path + '.tmp', path)
+        with self.lock:
+            self.disk_bytes += len(png)
+            if self.disk_bytes > self.max_bytes:
+                self.disk_bytes = _evict(self.tiledir, self.max_bytes,
+                                         ext='.png')
+
+    def request(self, z, x, y, prefetch=False):
+        """
+        Return the future of a tile, starting its render if needed.
+        Prefetches are skipped (returning `None`) if `max_prefetch` of
+        them are already in flight.
+        """
+        key = (z, x, y)
+        with self.lock:
+            if key in self.tiles:
+                self.tiles.move_to_end(key)
+                return _done(self.tiles[key])
+            if key in self.pending:
+                return self.pending[key]
+
+        if (self.tiledir is not None) and os.path.exists(self._path(*key)):
+            try:
+                with open(self._path(*key), 'rb') as f:
+                    png = f.read()
+                # The modification time marks the last use of the tile
+                os.utime(self._path(*key))
+            except FileNotFoundError:
+                # Evicted in the meantime
+                pass
+            else:
+                self._remember(key, png)
+                return _done(png)
+
+        with self.lock:
+            if key in self.pending:
+                return self.pending[key]
+            if prefetch:
+                if len(self.prefetching) >= self.max_prefetch:
+                    return None
+                self.prefetching.add(key)
+            future = self.pool.submit(NR_tile_png, self.P, z, x, y,
+                                      **self.args)
+            self.pending[key] = future
+        # The callback runs at once if the render is already done
+        future.add_done_callback(lambda f : self._store(key, f))
+        return future
+
+    def get(self, z, x, y):
+        """
+        Return the PNG bytes of a tile and prefetch its neighbours.
+        """
+        png = self.request(z, x, y).result()
+        if self.prefetch:
+            for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                self.request(z, x + dx, y + dy, prefetch=True)
+        return png
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+def _done(result):
+    f = Future()
+    f.set_result(result)
+    return f
+
+
+
+#######
+#
+#    HTTP SERVER
+#
+##########################################################################
+
+_index_html = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Newton fractal</title>
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<style>html, body, #map {{ height: 100%; margin: 0; }}</style>
+</head><body><div id="map"></div><script>
+var map = L.map('map', {{crs: L.CRS.Simple, minZoom: 0, maxZoom: {max_zoom}}});
+L.tileLayer('/{{z}}/{{x}}/{{y}}.png', {{tileSize: {tile},
+  noWrap: true, maxZoom: {max_zoom}}}).addTo(map);
+map.setView(map.unproject([{tile}/2, {tile}/2], 0), 0);
+</script></body></html>
+"""
+
+_tile_path = re.compile(r'^/(\d+)/(-?\d+)/(-?\d+)\.png$')
+
+def NR_serve(P, host='localhost', port=8000, max_zoom=40, **kwargs):
+    """
+    Serve slippy-map `z/x/y` PNG tiles of a Newton-Raphson fractal on a
+    local HTTP server, with a minimal Leaflet viewer at `/`.
+
+    Extra keyword arguments are passed to `NR_TileCache`. Blocks until
+    interrupted.
+    """
+    tiles = NR_TileCache(P, **kwargs)
+    index = _index_html.format(tile=tiles.args['tile'],
+                               max_zoom=max_zoom).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path in ('/', '/index.html'):
+                self._send(200, 'text/html', index)
+                return
+            m = _tile_path.match(self.path)
+            if m is None:
+                self._send(404, 'text/plain', b'Not found')
+                return
+            z, x, y = (int(g) for g in m.groups())
+            if z > max_zoom:
+                self._send(404, 'text/plain', b'Zoom level too high')
+                return
+            self._send(200, 'image/png', tiles.get(z, x, y))
+
+        def _send(self, code, ctype, body):
+            self.send_response(code)
+            self.send_header('Content-Type', ctype)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f'Serving the fractal at http://{host}:{port}/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        tiles.close()
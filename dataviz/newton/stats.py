@@ -0,0 +1,100 @@
+import os
+import numpy as np
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from .newton import *
+from .render import NR_iter_tiles
+
+#######
+#
+#    BASIN STATISTICS
+#
+##########################################################################
+
+def NR_basin_stats(P, N=512, n_steps=30,
+                   grid_lim_x=None, grid_lim_y=None,
+                   tol=1e-8, tile=256,
+                   backend=None, dtype=np.complex128, scheme=None):
+    """
+    Statistics of the basins of a Newton-Raphson fractal, accumulated
+    tile by tile while rendering. Only a single tile of the image exists
+    in memory at any time.
+
+    Parameters:
+    -----------
+    tol : float
+      Convergence threshold of the iteration. Points that did not
+      converge in `n_steps` steps are counted as non-converged.
+
+    See `NR_render_tiled` for the rest of the parameters.
+
+    Returns:
+    --------
+    stats : dict
+      'roots' : the roots of `P`,
+      'counts' : number of pixels in the basin of every root,
+      'area_fraction' : fraction of the window covered by every basin,
+      'iter_hist' : histogram of the step counts per basin, with shape
+        `(n_roots, n_steps + 2)`. The last column counts the pixels
+        that did not converge,
+      'mean_iter' : mean number of steps over all pixels, where the
+        pixels that did not converge count with `n_steps` steps,
+      'non_converged' : fraction of the pixels that did not converge.
+    """
+    assert tol is not None, "Convergence needs a tolerance!"
+    if grid_lim_x is None: grid_lim_x = NR_missing_grid_lim(P)
+    if grid_lim_y is None: grid_lim_y = NR_missing_grid_lim(P)
+
+    roots = P.roots()
+    n_roots, n_bins = len(roots), n_steps + 2
+    hist = np.zeros(n_roots * n_bins, dtype=np.int64)
+
+    for _, _, basin, n_iter in NR_iter_tiles(P, N, n_steps,
+                                             grid_lim_x, grid_lim_y,
+                                             tol=tol, tile=tile,
+                                             backend=backend, dtype=dtype,
+                                             scheme=scheme):
+        # Joint histogram of the basin indices and step counts
+        idx = basin.astype(np.intp) * n_bins + n_iter
+        hist += np.bincount(idx.reshape(-1), minlength=hist.size)
+    hist = hist.reshape(n_roots, n_bins)
+
+    counts = hist.sum(axis=1)
+    n_pixels = counts.sum()
+    iter_total = hist.sum(axis=0)
+
+    steps = np.minimum(np.arange(n_bins), n_steps)
+    return {
+        'roots' : np.array(roots),
+        'counts' : counts,
+        'area_fraction' : counts / n_pixels,
+        'iter_hist' : hist,
+        'mean_iter' : (iter_total * steps).sum() / n_pixels,
+        'non_converged' : iter_total[n_steps + 1] / n_pixels,
+    }
+
+def NR_basin_stats_many(polys, n_workers=None, chunksize=1, **kwargs):
+    """
+    `NR_basin_stats` of many polynomials, computed in a process pool.
+
+    Parameters:
+    -----------
+    polys : iterable of Polynomial
+      The polynomials to analyze.
+    n_workers : int or None
+      Number of worker processes. Defaults to the number of CPUs.
+    chunksize : int
+      Number of polynomials sent to a worker at once.
+    kwargs :
+      Parameters of `NR_basin_stats`, shared by all polynomials.
+
+    Returns:
+    --------
+    stats : list of dict
+      Statistics of the polynomials in the order of `polys`.
+    """
+    if n_workers is None: n_workers = os.cpu_count()
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(partial(NR_basin_stats, **kwargs), polys,
+                             chunksize=chunksize))
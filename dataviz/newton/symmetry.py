@@ -0,0 +1,138 @@
+import numpy as np
+
+from .newton import *
+from .render import (get_shape, get_grid_axes, get_grid_tile, get_tiles,
+                     NR_render_tile, NR_render_tiled)
+
+#######
+#
+#    SYMMETRY DETECTION
+#
+##########################################################################
+
+def _symmetric_lim(grid_lim):
+    lo, hi = grid_lim
+    return np.isclose(lo, -hi, rtol=0, atol=1e-12 * abs(hi - lo))
+
+def rotation_order(P):
+    """
+    Largest `k` for which `P(w z) = w^m P(z)` with `w = exp(2 pi i / k)`,
+    ie. the gcd of the differences of the exponents of the nonzero terms.
+    The Newton-Raphson fractal of `P` is then `k`-fold rotationally
+    symmetric around the origin. Monomials have no such order and 1 is
+    returned for them.
+    """
+    c = np.asarray(P.coeff_())
+    exps = (c.size - 1) - np.flatnonzero(c)
+    if exps.size < 2:
+        return 1
+    return int(np.gcd.reduce(np.diff(exps)))
+
+def root_permutation(roots, transform):
+    """
+    Index of `transform(r)` in `roots` for every root `r`, or `None` if
+    the roots are not mapped onto each other by `transform`.
+    """
+    roots = np.asarray(roots)
+    perm = closest_roots(transform(roots), roots)
+    if np.unique(perm).size != perm.size:
+        return None
+    return perm
+
+def get_symmetries(P, grid_lim_x, grid_lim_y):
+    """
+    Symmetries of the rendered image of `P` that map the pixel grid onto
+    itself.
+
+    Returns:
+    --------
+    sym : dict
+      Basin relabeling permutations of the available symmetries:
+      'conj' (mirroring about the real axis, for real coefficients and a
+      window symmetric in y) and 'rot' (rotation by 180 degrees, for an
+      even `rotation_order` and a window symmetric in both x and y).
+    """
+    sym = {}
+    if not hasattr(P, 'coeff_'):
+        return sym
+    roots = P.roots()
+    sym_y = _symmetric_lim(grid_lim_y)
+
+    if sym_y and np.isrealobj(np.real_if_close(P.coeff_(), tol=1)):
+        perm = root_permutation(roots, np.conj)
+        if perm is not None:
+            sym['conj'] = perm
+    if sym_y and _symmetric_lim(grid_lim_x) and rotation_order(P) % 2 == 0:
+        perm = root_permutation(roots, np.negative)
+        if perm is not None:
+            sym['rot'] = perm
+    return sym
+
+
+
+#######
+#
+#    SYMMETRIC RENDERING
+#
+##########################################################################
+
+def NR_render_symmetric(P, N, n_steps=10,
+                        grid_lim_x=None, grid_lim_y=None,
+                        tol=None, tile=1024,
+                        backend=None, dtype=np.complex128, scheme=None):
+    """
+    Render the basins of a Newton-Raphson fractal, computing only the
+    fundamental region of its symmetries (see `get_symmetries`).
+
+    The top half of the image is computed for a single symmetry, and the
+    top left quarter if both the mirror and the 180 degree rotation
+    symmetries are present. The rest is reconstructed by mirroring with
+    the basin indices relabeled. Without any symmetry, this is the same
+    as `NR_render_tiled`. Higher rotational symmetries (eg. the 90
+    degree one of `z^4 - 1`) do not map the pixel grid onto itself in
+    general, so they are not used.
+
+    See `NR_render_tiled` for the parameters and the returns.
+    """
+    if grid_lim_x is None: grid_lim_x = NR_missing_grid_lim(P)
+    if grid_lim_y is None: grid_lim_y = NR_missing_grid_lim(P)
+
+    sym = get_symmetries(P, grid_lim_x, grid_lim_y)
+    if not sym:
+        return NR_render_tiled(P, N, n_steps, grid_lim_x, grid_lim_y,
+                               tol=tol, tile=tile, backend=backend,
+                               dtype=dtype, scheme=scheme)
+
+    ny, nx = get_shape(N)
+    h, w = (ny + 1) // 2, nx
+    if 'conj' in sym and 'rot' in sym:
+        w = (nx + 1) // 2
+
+    basin = np.empty((ny, nx), dtype=basin_dtype(len(P.roots())))
+    n_iter = np.empty((ny, nx), dtype=iter_dtype(n_steps))
+
+    # Fundamental region
+    x, y = get_grid_axes(N, grid_lim_x, grid_lim_y, dtype=dtype)
+    x, y = x[:w], y[:h]
+    for rows, cols in get_tiles((h, w), tile):
+        Z = get_grid_tile(x, y, rows, cols)
+        basin[rows, cols], n_iter[rows, cols] = NR_render_tile(
+            P, Z, n_steps, tol=tol, backend=backend, scheme=scheme
+        )
+
+    # z -> -conj(z) maps the left half onto the right one
+    if w < nx:
+        perm = sym['rot'][sym['conj']]
+        basin[:h, w:] = perm[basin[:h, nx-w-1::-1]]
+        n_iter[:h, w:] = n_iter[:h, nx-w-1::-1]
+
+    # z -> conj(z) or z -> -z maps the top half onto the bottom one
+    b = ny - h
+    if b > 0 and 'conj' in sym:
+        basin[h:] = sym['conj'][basin[b-1::-1]]
+        n_iter[h:] = n_iter[b-1::-1]
+    elif b > 0:
+        basin[h:] = sym['rot'][basin[b-1::-1, ::-1]]
+        n_iter[h:] = n_iter[b-1::-1, ::-1]
+
+    return basin, n_iter
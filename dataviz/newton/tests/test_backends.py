@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from newton.polynomial import Polynomial
+from newton.render import NR_render_tiled
+from newton.backends import BACKENDS, available_backends
+
+# Above degree 30, `numexpr` would run out of input operands if the
+# coefficients were passed as arrays
+POLYS = {
+    'quintic' : Polynomial([1, 0, 0, 1, -1, 1]),
+    'random40' : Polynomial(np.random.default_rng(40).normal(size=41)),
+}
+GRID = dict(N=300, n_steps=30, grid_lim_x=(-2, 2), grid_lim_y=(-2, 2))
+
+# Single precision results of the backends are not bit-identical, since
+# they evaluate the polynomial in different orders. The mismatches stay
+# at isolated pixels: at most these fractions of the basins and step
+# counts may differ from the `numpy` backend. Rounding errors grow with
+# the degree, so the tolerances are set per polynomial
+TOL_64 = {
+    'quintic' : (1e-4, 1e-3),
+    'random40' : (5e-4, 1e-3),
+}
+
+def render(name, backend, tol, dtype):
+    if backend not in available_backends():
+        pytest.skip(f"The '{backend}' backend is not installed")
+    return NR_render_tiled(POLYS[name], **GRID, tol=tol, backend=backend,
+                           dtype=dtype)
+
+@pytest.mark.parametrize('backend', BACKENDS[1:])
+@pytest.mark.parametrize('tol', [None, 1e-8])
+@pytest.mark.parametrize('name', POLYS)
+def test_backends_identical_double(name, backend, tol):
+    basin, n_iter = render(name, backend, tol, np.complex128)
+    basin_ref, n_iter_ref = render(name, 'numpy', tol, np.complex128)
+    np.testing.assert_array_equal(basin, basin_ref)
+    np.testing.assert_array_equal(n_iter, n_iter_ref)
+
+@pytest.mark.parametrize('backend', BACKENDS[1:])
+@pytest.mark.parametrize('tol', [None, 1e-8])
+@pytest.mark.parametrize('name', POLYS)
+def test_backends_agree_single(name, backend, tol):
+    basin, n_iter = render(name, backend, tol, np.complex64)
+    basin_ref, n_iter_ref = render(name, 'numpy', tol, np.complex64)
+    tol_basin, tol_iter = TOL_64[name]
+    assert np.mean(basin != basin_ref) <= tol_basin
+    assert np.mean(n_iter != n_iter_ref) <= tol_iter
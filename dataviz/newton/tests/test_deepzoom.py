@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('mpmath')
+
+from newton.polynomial import Polynomial
+from newton.render import NR_render_tiled
+from newton.deepzoom import NR_render_deep
+
+P = Polynomial([1, 0, 0, -1])
+N, N_STEPS, WIDTH = 128, 100, 1e-6
+
+# Windows that double precision still resolves: the critical point where
+# all basins meet, and a point on a basin boundary
+CENTERS = [1e-25, -0.7400929831305728-0.17j]
+
+@pytest.mark.parametrize('center', CENTERS)
+def test_deep_matches_double(center):
+    basin, _ = NR_render_deep(P, center, WIDTH, N, n_steps=N_STEPS)
+    x = (center.real - WIDTH/2, center.real + WIDTH/2)
+    y = (center.imag - WIDTH/2, center.imag + WIDTH/2)
+    basin_ref, _ = NR_render_tiled(P, N, N_STEPS, x, y, tol=1e-8)
+    assert np.mean(basin == basin_ref) >= 0.999
+
+def test_critical_point_center():
+    basin, _ = NR_render_deep(P, 0, 1e-20, 16, n_steps=N_STEPS)
+    assert basin.shape == (16, 16)
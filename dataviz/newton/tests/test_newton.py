@@ -0,0 +1,16 @@
+import numpy as np
+
+from newton.polynomial import Polynomial
+from newton.newton import NR_iter_active
+
+def test_converged_on_last_step():
+    # The point converges in exactly 3 steps
+    P = Polynomial([1, 0, 0, -1])
+    Z = np.array([1 + 0.01j])
+    _, n_iter = NR_iter_active(P, Z, 10, tol=1e-8)
+    assert n_iter[0] == 3
+
+    _, n_iter = NR_iter_active(P, Z, 3, tol=1e-8)
+    assert n_iter[0] == 3
+    _, n_iter = NR_iter_active(P, Z, 2, tol=1e-8)
+    assert n_iter[0] == 2 + 1
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from newton.polynomial import Polynomial
+from newton.render import NR_render_tiled
+
+POLYS = {
+    'z^10-1' : Polynomial(np.r_[1, np.zeros(9), -1]),
+    'random14' : Polynomial(np.random.default_rng(42).normal(size=15)),
+}
+
+@pytest.mark.parametrize('name', POLYS)
+def test_single_precision_basins(name):
+    P = POLYS[name]
+    basin_64, _ = NR_render_tiled(P, 300, 50, tol=1e-8, dtype=np.complex128)
+    basin_32, _ = NR_render_tiled(P, 300, 50, tol=1e-8, dtype=np.complex64)
+    assert np.mean(basin_32 == basin_64) >= 0.99